@@ -23,6 +23,10 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Fast JSON serialization (orjson)
+    from .services import json_provider
+    json_provider.init_app(app)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
@@ -62,7 +66,7 @@ def create_app(config_name=None):
         _seed_admin(app)
     
     # Register blueprints
-    from .routes import auth, users, stores, products, categories, orders, chat, reviews, admin, uploads, subscriptions, notifications, wishlist, reports
+    from .routes import auth, users, stores, products, categories, orders, chat, reviews, admin, uploads, subscriptions, notifications, wishlist, reports, cart
     
     app.register_blueprint(auth, url_prefix='/api/v1/auth')
     app.register_blueprint(users, url_prefix='/api/v1/users')
@@ -78,10 +82,39 @@ def create_app(config_name=None):
     app.register_blueprint(notifications, url_prefix='/api/v1/notifications')
     app.register_blueprint(wishlist, url_prefix='/api/v1/wishlist')
     app.register_blueprint(reports, url_prefix='/api/v1/reports')
+    app.register_blueprint(cart, url_prefix='/api/v1/cart')
     # Register socket events
     from .sockets import register_socket_events
     register_socket_events(socketio)
     
+    # CLI maintenance commands
+    from .commands import register_commands
+    register_commands(app)
+    
+    # Background jobs, started on the first request
+    from .jobs import register_jobs
+    from .services import scheduler
+    register_jobs()
+    scheduler.init_app(app)
+    
+    # Response compression and ETags. after_request hooks run in reverse
+    # registration order, so ETags are computed on the uncompressed body.
+    from .services import compression, etag
+    compression.init_app(app)
+    etag.init_app(app)
+    
+    # Category facet counts, kept current from product writes
+    from .services import facets
+    facets.init_app(app)
+    
+    # Idempotency-Key claims are marked in the transaction that commits the handler's work
+    from .services import idempotency
+    idempotency.init_app(app)
+    
+    # Access-token claims and revocation by token version
+    from .services import tokens
+    tokens.init_app(app, jwt)
+    
     # JWT error handlers
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -105,6 +138,7 @@ def create_app(config_name=None):
     
     # Public settings endpoint (no auth required)
     @app.route('/api/v1/settings')
+    @etag.conditional(lambda: etag.table_stamp('app_settings'))
     def public_settings():
         from .models import AppSettings
         row = AppSettings.query.first()
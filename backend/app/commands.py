@@ -0,0 +1,66 @@
+"""
+Maintenance commands, run with `flask --app run <command>`.
+"""
+import click
+
+
+def register_commands(app):
+    """Attach maintenance commands to the Flask CLI."""
+
+    @app.cli.command('rebuild-rating-stats')
+    def rebuild_rating_stats():
+        """Backfill product_rating_stats and product ratings from the reviews table."""
+        from .services import ratings
+        count = ratings.rebuild()
+        click.echo(f'Rebuilt rating stats for {count} products.')
+        count = ratings.recompute_store_ratings()
+        click.echo(f'Recomputed ratings for {count} stores.')
+
+    @app.cli.command('recompute-store-ratings')
+    def recompute_store_ratings():
+        """Recompute store review counts and ratings from the reviews table."""
+        from .services import ratings
+        count = ratings.recompute_store_ratings()
+        click.echo(f'Recomputed ratings for {count} stores.')
+
+    @app.cli.command('release-expired-holds')
+    def release_expired_holds():
+        """Return stock held by unpaid orders whose hold has expired."""
+        from .jobs import release_expired_holds
+        total = release_expired_holds()
+        click.echo(f'Released {total} expired stock holds.')
+
+    @app.cli.command('expire-stale-orders')
+    def expire_stale_orders():
+        """Cancel orders left unpaid or unapproved past their timeout."""
+        from .jobs import expire_stale_orders
+        total = expire_stale_orders()
+        click.echo(f'Expired {total} stale orders.')
+
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys():
+        """Delete expired Idempotency-Key records."""
+        from .services import idempotency
+        count = idempotency.purge_expired()
+        click.echo(f'Purged {count} expired idempotency keys.')
+
+    @app.cli.command('rebuild-daily-stats')
+    def rebuild_daily_stats():
+        """Backfill daily_platform_stats from the orders and users tables."""
+        from .services import dashboard
+        count = dashboard.rebuild()
+        click.echo(f'Rebuilt platform stats for {count} days.')
+
+    @app.cli.command('rebuild-sales-rollups')
+    def rebuild_sales_rollups():
+        """Recompute store and product daily sales rollups from the orders table."""
+        from .services import analytics
+        count = analytics.rebuild()
+        click.echo(f'Rebuilt {count} store sales rows.')
+
+    @app.cli.command('run-jobs')
+    def run_jobs():
+        """Run every scheduled job that is due, e.g. from cron when the in-process scheduler is off."""
+        from .services import scheduler
+        ran = scheduler.run_pending()
+        click.echo(f'Ran {len(ran)} job(s): {", ".join(ran) or "none due"}.')
@@ -19,9 +19,19 @@ class Config:
         'pool_recycle': 300,
     }
     
+    # Password hashing cost (bcrypt log rounds); hashes at another cost are upgraded on login
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    # Hash in eventlet's native thread pool so logins don't block the hub
+    PASSWORD_HASH_THREADPOOL = os.getenv('PASSWORD_HASH_THREADPOOL', 'true').lower() == 'true'
+    
+    # Throttling of login, registration and OTP emails: 'memory' or 'database' (shared by workers)
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    # Short-lived: access tokens carry role/seller claims that are refreshed from the database
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 15)))
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     JWT_TOKEN_LOCATION = ['headers']
     JWT_HEADER_NAME = 'Authorization'
@@ -41,9 +51,40 @@ class Config:
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD', '')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@maumart.com')
     
+    # Response compression (gzip/brotli) for payloads above this size in bytes
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4
+    
     # OTP
     OTP_EXPIRY_MINUTES = 10
     
+    # Stock held for an unpaid order before it is released back to the product
+    STOCK_HOLD_MINUTES = int(os.getenv('STOCK_HOLD_MINUTES', 30))
+    
+    # How long a stored Idempotency-Key response can be replayed
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    # An unfinished claim older than this is abandoned (crashed worker) and a retry may take it over
+    IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS = int(os.getenv('IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS', 120))
+    
+    # Unpaid / unapproved orders are cancelled after these timeouts
+    ORDER_PAYMENT_TIMEOUT_HOURS = int(os.getenv('ORDER_PAYMENT_TIMEOUT_HOURS', 24))
+    ORDER_APPROVAL_TIMEOUT_HOURS = int(os.getenv('ORDER_APPROVAL_TIMEOUT_HOURS', 72))
+    
+    # In-process job scheduler (expiry sweeps, purges)
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_TICK_SECONDS = int(os.getenv('SCHEDULER_TICK_SECONDS', 30))
+    
+    # Ad rotation: impressions of one ad per viewer per window
+    AD_FREQUENCY_CAP = int(os.getenv('AD_FREQUENCY_CAP', 5))
+    AD_FREQUENCY_WINDOW_MINUTES = int(os.getenv('AD_FREQUENCY_WINDOW_MINUTES', 60))
+    
+    # Admin dashboard counts are cached this long
+    DASHBOARD_CACHE_SECONDS = int(os.getenv('DASHBOARD_CACHE_SECONDS', 30))
+    
+    # Admin roles and support-admin permissions are cached this long
+    PERMISSION_CACHE_SECONDS = int(os.getenv('PERMISSION_CACHE_SECONDS', 60))
+    
     # App settings
     APP_NAME = 'MAU MART'
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
@@ -65,6 +106,9 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SCHEDULER_ENABLED = False
+    BCRYPT_LOG_ROUNDS = 4
+    RATE_LIMIT_ENABLED = False
 
 
 config = {
@@ -0,0 +1,118 @@
+"""
+Scheduled background jobs, run by app.services.scheduler.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from . import db, socketio
+from .models import Order, OrderItem, OrderStatus
+from .services import (
+    ad_server, analytics, dashboard, idempotency, inventory, notify, order_states, otp, placements, rate_limit,
+    scheduler,
+)
+
+
+EXPIRE_BATCH_SIZE = 200
+
+
+def _stale_orders(now, limit):
+    payment_cutoff = now - timedelta(hours=current_app.config.get('ORDER_PAYMENT_TIMEOUT_HOURS', 24))
+    approval_cutoff = now - timedelta(hours=current_app.config.get('ORDER_APPROVAL_TIMEOUT_HOURS', 72))
+    return Order.query.options(
+        db.joinedload(Order.store),
+        db.selectinload(Order.items).joinedload(OrderItem.product),
+    ).filter(db.or_(
+        db.and_(Order.status == OrderStatus.PENDING_PAYMENT.value, Order.created_at < payment_cutoff),
+        db.and_(Order.status == OrderStatus.AWAITING_APPROVAL.value, Order.payment_confirmed_at < approval_cutoff),
+    )).order_by(Order.id).limit(limit).with_for_update(skip_locked=True, of=Order).all()
+
+
+def _expiry_reason(order):
+    if order.status == OrderStatus.PENDING_PAYMENT.value:
+        return 'Payment was not confirmed in time'
+    return 'The seller did not respond in time'
+
+
+def _notify_expired(orders):
+    """One notification and one socket batch per buyer and per seller."""
+    by_user = {}
+    for order in orders:
+        by_user.setdefault(order.buyer_id, []).append(order)
+        by_user.setdefault(order.store.owner_id, []).append(order)
+
+    notifications = []
+    for user_id, user_orders in by_user.items():
+        numbers = ', '.join(f'#{o.order_number}' for o in user_orders)
+        if len(user_orders) == 1:
+            message = f'Order {numbers} was cancelled automatically. {user_orders[0].seller_note}.'
+        else:
+            message = f'{len(user_orders)} orders were cancelled automatically: {numbers}'
+        notifications.append(notify.build(
+            user_id=user_id,
+            title='Order Expired ⌛',
+            message=message,
+            data={'order_ids': [o.id for o in user_orders]}
+        ))
+    return notifications, by_user
+
+
+def expire_stale_orders(now=None, batch_size=EXPIRE_BATCH_SIZE):
+    """Cancel orders stuck in pending_payment or awaiting_approval and release their stock."""
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        orders = _stale_orders(now, batch_size)
+        if not orders:
+            break
+        reasons = {o.id: _expiry_reason(o) for o in orders}
+        order_states.apply(orders, 'expire', now=now)
+        for order in orders:
+            order.seller_note = reasons[order.id]
+        notifications, by_user = _notify_expired(orders)
+        db.session.commit()
+
+        notify.emit(notifications)
+        for user_id, user_orders in by_user.items():
+            socketio.emit('order_status_batch', {
+                'status': OrderStatus.CANCELLED.value,
+                'orders': [{'order_id': o.id, 'status': o.status} for o in user_orders]
+            }, room=f'user_{user_id}')
+
+        total += len(orders)
+        if len(orders) < batch_size:
+            break
+    return total
+
+
+def release_expired_holds():
+    """Return stock held by unpaid orders whose hold has expired."""
+    total = 0
+    while True:
+        released = inventory.release_expired()
+        db.session.commit()
+        total += released
+        if not released:
+            return total
+
+
+def sweep_placements():
+    """Expire ended featured listings, ad requests and banners and refresh the live snapshot."""
+    changed = placements.sweep()
+    db.session.commit()
+    if changed:
+        placements.invalidate()
+    return changed
+
+
+def register_jobs():
+    """Register the built-in jobs with the scheduler."""
+    scheduler.register('release_expired_holds', timedelta(minutes=1), release_expired_holds)
+    scheduler.register('sweep_placements', timedelta(minutes=1), sweep_placements)
+    scheduler.register('flush_ad_impressions', timedelta(minutes=1), ad_server.flush_impressions)
+    scheduler.register('expire_stale_orders', timedelta(minutes=10), expire_stale_orders)
+    scheduler.register('rollup_platform_stats', timedelta(minutes=5), dashboard.rollup_recent)
+    scheduler.register('reconcile_sales_rollups', timedelta(days=1), analytics.reconcile_recent)
+    scheduler.register('purge_idempotency_keys', timedelta(hours=1), idempotency.purge_expired)
+    scheduler.register('purge_rate_limit_buckets', timedelta(hours=1), rate_limit.purge_stale)
+    scheduler.register('purge_otp_logs', timedelta(hours=1), otp.purge)
@@ -1,7 +1,6 @@
 from datetime import datetime
 from enum import Enum
 from app import db
-import bcrypt
 
 
 class UserRole(str, Enum):
@@ -37,7 +36,8 @@ class StoreRequestStatus(str, Enum):
 # Association tables
 product_categories = db.Table('product_categories',
     db.Column('product_id', db.Integer, db.ForeignKey('products.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True),
+    db.Index('ix_product_categories_category_id', 'category_id')
 )
 
 
@@ -55,8 +55,9 @@ class User(db.Model):
     is_seller = db.Column(db.Boolean, default=False)
     is_verified = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped to revoke access tokens
     avatar_url = db.Column(db.String(500), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -65,12 +66,14 @@ class User(db.Model):
     reviews = db.relationship('Review', backref='author', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        from app.services import passwords
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        from app.services import passwords
+        return passwords.check_password(password, self.password_hash)
     
-    def to_dict(self, include_sensitive=False):
+    def to_dict(self, include_sensitive=False, fieldset=None):
         data = {
             'id': self.id,
             'first_name': self.first_name,
@@ -87,22 +90,27 @@ class User(db.Model):
             'is_active': self.is_active,
         }
         # Include permissions for support admins
-        if self.role == 'support_admin':
-            admin_role = AdminRole.query.filter_by(user_id=self.id).first() if self.id else None
-            data['permissions'] = admin_role.permissions if admin_role else []
-        return data
+        if self.role == 'support_admin' and (fieldset is None or fieldset.wants('permissions')):
+            from app.services import admin_access
+            data['permissions'] = admin_access.permissions(self.id) if self.id else []
+        return fieldset.pick(data) if fieldset else data
 
 
 class OtpLog(db.Model):
     __tablename__ = 'otp_logs'
     
     id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(255), nullable=False, index=True)
+    email = db.Column(db.String(255), nullable=False)
     otp_code = db.Column(db.String(6), nullable=False)
     purpose = db.Column(db.String(50), nullable=False)  # 'verification', 'password_reset'
     is_used = db.Column(db.Boolean, default=False)
     expires_at = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Matches the lookup in services.otp.consume(); its email prefix also serves issue()
+    __table_args__ = (
+        db.Index('ix_otp_logs_lookup', 'email', 'purpose', 'otp_code', 'is_used', 'expires_at'),
+    )
 
 
 class Store(db.Model):
@@ -128,6 +136,7 @@ class Store(db.Model):
     account_name = db.Column(db.String(200), nullable=True)
     rating = db.Column(db.Float, default=0.0)
     total_reviews = db.Column(db.Integer, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Sum of visible review stars
     total_orders = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -136,7 +145,7 @@ class Store(db.Model):
     products = db.relationship('Product', backref='store', lazy='dynamic')
     orders = db.relationship('Order', backref='store', lazy=True)
     
-    def to_dict(self, include_bank=False, include_owner=False):
+    def to_dict(self, include_bank=False, include_owner=False, fieldset=None):
         data = {
             'id': self.id,
             'owner_id': self.owner_id,
@@ -156,18 +165,31 @@ class Store(db.Model):
             'rating': self.rating,
             'total_reviews': self.total_reviews,
             'total_orders': self.total_orders,
-            'total_products': self.products.count() if self.products else 0,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
+        if fieldset is None or fieldset.wants('total_products'):
+            data['total_products'] = self.products.count() if self.products else 0
         if include_bank:
             data['bank_name'] = self.bank_name
             data['account_number'] = self.account_number
             data['account_name'] = self.account_name
         
+        if fieldset is not None:
+            if fieldset.includes('owner'):
+                data['owner'] = self.owner.to_dict(fieldset=fieldset.nested('owner')) if self.owner else None
+            return fieldset.pick(data)
+        
         if include_owner and self.owner:
             data['owner'] = self.owner.to_dict()
             
         return data
+    
+    @staticmethod
+    def load_options(fieldset=None, include_owner=False):
+        """Eager-load options for the relationships to_dict() will serialize"""
+        if fieldset is not None:
+            include_owner = fieldset.includes('owner')
+        return [db.joinedload(Store.owner)] if include_owner else []
 
 
 class StoreRequest(db.Model):
@@ -224,8 +246,8 @@ class Category(db.Model):
     sort_order = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
+    def to_dict(self, fieldset=None):
+        data = {
             'id': self.id,
             'name': self.name,
             'slug': self.slug,
@@ -235,6 +257,7 @@ class Category(db.Model):
             'is_active': self.is_active,
             'sort_order': self.sort_order,
         }
+        return fieldset.pick(data) if fieldset else data
 
 
 class Product(db.Model):
@@ -266,7 +289,14 @@ class Product(db.Model):
     media = db.relationship('ProductMedia', backref='product', lazy=True, cascade='all, delete-orphan')
     reviews = db.relationship('Review', backref='product', lazy=True)
     
-    def to_dict(self, include_store=False):
+    # Listing shapes used by app.services.product_query
+    __table_args__ = (
+        db.Index('ix_products_active_created_at', 'is_active', 'created_at'),
+        db.Index('ix_products_active_price', 'is_active', 'price'),
+        db.Index('ix_products_store_active_created_at', 'store_id', 'is_active', 'created_at'),
+    )
+    
+    def to_dict(self, include_store=False, fieldset=None):
         data = {
             'id': self.id,
             'store_id': self.store_id,
@@ -286,13 +316,41 @@ class Product(db.Model):
             'total_reviews': self.total_reviews,
             'total_orders': self.total_orders,
             'views': self.views,
-            'categories': [c.to_dict() for c in self.categories],
-            'media': [m.to_dict() for m in self.media],
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
+        if fieldset is not None:
+            if fieldset.includes('categories'):
+                data['categories'] = [c.to_dict(fieldset=fieldset.nested('categories')) for c in self.categories]
+            if fieldset.includes('media'):
+                data['media'] = [m.to_dict(fieldset=fieldset.nested('media')) for m in self.media]
+            if fieldset.includes('store'):
+                # Cards never need the seller's bank details
+                data['store'] = self.store.to_dict(fieldset=fieldset.nested('store')) if self.store else None
+            return fieldset.pick(data)
+        
+        data['categories'] = [c.to_dict() for c in self.categories]
+        data['media'] = [m.to_dict() for m in self.media]
         if include_store:
             data['store'] = self.store.to_dict(include_bank=True) if self.store else None
         return data
+    
+    @staticmethod
+    def load_options(fieldset=None, include_store=False):
+        """Eager-load options for the relationships to_dict() will serialize"""
+        if fieldset is None:
+            options = [db.selectinload(Product.categories), db.selectinload(Product.media)]
+            if include_store:
+                options.append(db.joinedload(Product.store))
+            return options
+        
+        options = []
+        if fieldset.includes('categories'):
+            options.append(db.selectinload(Product.categories))
+        if fieldset.includes('media'):
+            options.append(db.selectinload(Product.media))
+        if fieldset.includes('store'):
+            options.append(db.joinedload(Product.store))
+        return options
 
 
 class ProductMedia(db.Model):
@@ -305,13 +363,14 @@ class ProductMedia(db.Model):
     sort_order = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
+    def to_dict(self, fieldset=None):
+        data = {
             'id': self.id,
             'url': self.url,
             'media_type': self.media_type,
             'sort_order': self.sort_order,
         }
+        return fieldset.pick(data) if fieldset else data
 
 
 class Order(db.Model):
@@ -332,13 +391,22 @@ class Order(db.Model):
     approved_at = db.Column(db.DateTime, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
     receipt_url = db.Column(db.String(500), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     product = db.relationship('Product', backref='orders')
+    items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan',
+                            order_by='OrderItem.id')
+    
+    @property
+    def lines(self):
+        """(product_id, quantity) for every product in the order; single-product orders have no items"""
+        if self.items:
+            return [(item.product_id, item.quantity) for item in self.items]
+        return [(self.product_id, self.quantity)]
     
-    def to_dict(self, include_details=False):
+    def to_dict(self, include_details=False, fieldset=None):
         data = {
             'id': self.id,
             'order_number': self.order_number,
@@ -351,14 +419,122 @@ class Order(db.Model):
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
+        if fieldset is not None:
+            data['buyer_note'] = self.buyer_note
+            data['seller_note'] = self.seller_note
+            data['receipt_url'] = self.receipt_url
+            if fieldset.includes('items'):
+                data['items'] = [i.to_dict(fieldset=fieldset.nested('items')) for i in self.items]
+            for name in ('product', 'store', 'buyer'):
+                if fieldset.includes(name):
+                    related = getattr(self, name)
+                    data[name] = related.to_dict(fieldset=fieldset.nested(name)) if related else None
+            return fieldset.pick(data)
+        
         if include_details:
             data['product'] = self.product.to_dict() if self.product else None
             data['store'] = self.store.to_dict() if self.store else None
             data['buyer'] = self.buyer.to_dict() if self.buyer else None
+            data['items'] = [i.to_dict() for i in self.items]
             data['buyer_note'] = self.buyer_note
             data['seller_note'] = self.seller_note
             data['receipt_url'] = self.receipt_url
         return data
+    
+    @staticmethod
+    def load_options(fieldset=None, include_details=False):
+        """Eager-load options for the relationships to_dict() will serialize"""
+        if fieldset is None:
+            if not include_details:
+                return []
+            return [
+                db.joinedload(Order.product).selectinload(Product.categories),
+                db.joinedload(Order.product).selectinload(Product.media),
+                db.joinedload(Order.store),
+                db.joinedload(Order.buyer),
+                db.selectinload(Order.items).joinedload(OrderItem.product),
+            ]
+        
+        options = []
+        if fieldset.includes('items'):
+            options.append(db.selectinload(Order.items).joinedload(OrderItem.product))
+        if fieldset.includes('product'):
+            options.append(db.joinedload(Order.product).options(*Product.load_options(fieldset.nested('product'))))
+        if fieldset.includes('store'):
+            options.append(db.joinedload(Order.store))
+        if fieldset.includes('buyer'):
+            options.append(db.joinedload(Order.buyer))
+        return options
+
+
+class OrderItem(db.Model):
+    """One product line of a multi-item (cart checkout) order"""
+    __tablename__ = 'order_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    unit_price = db.Column(db.Numeric(12, 2), nullable=False)
+    total_price = db.Column(db.Numeric(12, 2), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    product = db.relationship('Product')
+
+    def to_dict(self, fieldset=None):
+        data = {
+            'id': self.id,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'unit_price': float(self.unit_price),
+            'total_price': float(self.total_price),
+            'product': {
+                'id': self.product.id,
+                'title': self.product.title,
+                'slug': self.product.slug,
+            } if self.product else None,
+        }
+        return fieldset.pick(data) if fieldset else data
+
+
+class CartItem(db.Model):
+    __tablename__ = 'cart_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    product = db.relationship('Product')
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'product_id', name='uq_cart_user_product'),)
+
+
+class ReservationStatus(str, Enum):
+    ACTIVE = 'active'
+    COMMITTED = 'committed'
+    RELEASED = 'released'
+
+
+class StockReservation(db.Model):
+    """Stock held for an order, managed by services.inventory"""
+    __tablename__ = 'stock_reservations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=ReservationStatus.ACTIVE.value)
+    expires_at = db.Column(db.DateTime, nullable=True)  # None = held until the seller decides
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('order_id', 'product_id', name='uq_reservation_order_product'),
+        db.Index('ix_stock_reservations_status_expires_at', 'status', 'expires_at'),
+    )
 
 
 class Chat(db.Model):
@@ -367,23 +543,28 @@ class Chat(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user1_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     user2_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Canonical pair key: one chat per pair of users, whoever started it
+    user_min_id = db.Column(db.Integer, nullable=False)
+    user_max_id = db.Column(db.Integer, nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True)
     last_message_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (db.UniqueConstraint('user_min_id', 'user_max_id', name='uq_chat_user_pair'),)
+    
     # Relationships
     user1 = db.relationship('User', foreign_keys=[user1_id])
     user2 = db.relationship('User', foreign_keys=[user2_id])
     product = db.relationship('Product')
     messages = db.relationship('Message', backref='chat', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self, current_user_id=None):
+    def to_dict(self, current_user_id=None, fieldset=None):
+        if fieldset is not None:
+            return self._to_sparse_dict(current_user_id, fieldset)
+        
         other_user = self.user2 if self.user1_id == current_user_id else self.user1
         last_msg = self.messages.order_by(Message.created_at.desc()).first()
-        unread = self.messages.filter(
-            Message.sender_id != current_user_id,
-            Message.is_read == False
-        ).count() if current_user_id else 0
+        unread = self._unread_count(current_user_id)
         
         other_user_data = other_user.to_dict() if other_user else None
         if other_user_data and other_user and other_user.store:
@@ -398,6 +579,41 @@ class Chat(db.Model):
             'unread_count': unread,
             'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
         }
+    
+    def _unread_count(self, current_user_id):
+        return self.messages.filter(
+            Message.sender_id != current_user_id,
+            Message.is_read == False
+        ).count() if current_user_id else 0
+    
+    def _to_sparse_dict(self, current_user_id, fieldset):
+        data = {
+            'id': self.id,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+        }
+        if fieldset.wants('unread_count'):
+            data['unread_count'] = self._unread_count(current_user_id)
+        if fieldset.includes('other_user'):
+            other_user = self.user2 if self.user1_id == current_user_id else self.user1
+            data['other_user'] = other_user.to_dict(fieldset=fieldset.nested('other_user')) if other_user else None
+        if fieldset.includes('product'):
+            data['product'] = self.product.to_dict(fieldset=fieldset.nested('product')) if self.product else None
+        if fieldset.includes('last_message'):
+            last_msg = self.messages.order_by(Message.created_at.desc()).first()
+            data['last_message'] = last_msg.to_dict(fieldset=fieldset.nested('last_message')) if last_msg else None
+        return fieldset.pick(data)
+    
+    @staticmethod
+    def load_options(fieldset=None):
+        """Eager-load options for the relationships to_dict() will serialize"""
+        if fieldset is None:
+            return [db.joinedload(Chat.user1), db.joinedload(Chat.user2), db.joinedload(Chat.product)]
+        options = []
+        if fieldset.includes('other_user'):
+            options += [db.joinedload(Chat.user1), db.joinedload(Chat.user2)]
+        if fieldset.includes('product'):
+            options.append(db.joinedload(Chat.product))
+        return options
 
 
 class Message(db.Model):
@@ -417,8 +633,8 @@ class Message(db.Model):
     sender = db.relationship('User')
     order = db.relationship('Order')
     
-    def to_dict(self):
-        return {
+    def to_dict(self, fieldset=None):
+        data = {
             'id': self.id,
             'chat_id': self.chat_id,
             'sender_id': self.sender_id,
@@ -428,8 +644,13 @@ class Message(db.Model):
             'order_id': self.order_id,
             'is_read': self.is_read,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'sender': self.sender.to_dict() if self.sender else None,
         }
+        if fieldset is None:
+            data['sender'] = self.sender.to_dict() if self.sender else None
+            return data
+        if fieldset.includes('sender'):
+            data['sender'] = self.sender.to_dict(fieldset=fieldset.nested('sender')) if self.sender else None
+        return fieldset.pick(data)
 
 
 class Review(db.Model):
@@ -459,6 +680,40 @@ class Review(db.Model):
         }
 
 
+class ProductRatingStats(db.Model):
+    """Per-product rollup of visible reviews, maintained by services.ratings"""
+    __tablename__ = 'product_rating_stats'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    count_1 = db.Column(db.Integer, nullable=False, default=0)
+    count_2 = db.Column(db.Integer, nullable=False, default=0)
+    count_3 = db.Column(db.Integer, nullable=False, default=0)
+    count_4 = db.Column(db.Integer, nullable=False, default=0)
+    count_5 = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def distribution(self):
+        return {star: getattr(self, f'count_{star}') or 0 for star in range(1, 6)}
+
+    @property
+    def total(self):
+        return sum(self.distribution.values())
+
+    @property
+    def average(self):
+        total = self.total
+        return round((self.rating_sum or 0) / total, 1) if total else 0
+
+    def to_dict(self):
+        return {
+            'average': self.average,
+            'total': self.total,
+            'distribution': self.distribution,
+        }
+
+
 class Subscription(db.Model):
     __tablename__ = 'subscriptions'
     
@@ -690,6 +945,7 @@ class AdRequest(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected, expired
     approved_at = db.Column(db.DateTime, nullable=True)
     rejection_reason = db.Column(db.Text, nullable=True)
+    impressions = db.Column(db.Integer, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     store = db.relationship('Store')
@@ -706,6 +962,7 @@ class AdRequest(db.Model):
             'starts_at': self.starts_at.isoformat() if self.starts_at else None,
             'expires_at': self.expires_at.isoformat() if self.expires_at else None,
             'status': self.status,
+            'impressions': self.impressions or 0,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
 
@@ -717,3 +974,86 @@ class AppSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     data = db.Column(db.JSON, nullable=False, default=dict)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class IdempotencyKey(db.Model):
+    """Stored response for a client-supplied Idempotency-Key, see services.idempotency"""
+    __tablename__ = 'idempotency_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status_code = db.Column(db.Integer, nullable=True)  # None while in progress, 0 once the handler committed
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),)
+
+
+class JobLease(db.Model):
+    """Lease row per scheduled job; only the worker holding an unexpired lease runs it"""
+    __tablename__ = 'job_leases'
+
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+
+
+class RateLimitBucket(db.Model):
+    """Token bucket for the shared rate-limit backend, see services.rate_limit"""
+    __tablename__ = 'rate_limit_buckets'
+
+    key = db.Column(db.String(255), primary_key=True)  # endpoint:scope:value
+    tokens = db.Column(db.Float, nullable=False)
+    refilled_at = db.Column(db.Float, nullable=False, index=True)  # Unix time of the last refill
+
+
+class DailyPlatformStats(db.Model):
+    """Per-day platform totals for the admin dashboard charts"""
+    __tablename__ = 'daily_platform_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    gmv = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    signups = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'orders': self.orders,
+            'gmv': float(self.gmv or 0),
+            'signups': self.signups,
+        }
+
+
+class StoreDailySales(db.Model):
+    """Orders entering each status per store and day, maintained by app.services.analytics"""
+    __tablename__ = 'store_daily_sales'
+
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(30), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+
+class ProductDailySales(db.Model):
+    """Order lines entering each status per product and day, maintained by app.services.analytics"""
+    __tablename__ = 'product_daily_sales'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(30), primary_key=True)
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.id', ondelete='CASCADE'), nullable=False)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_product_daily_sales_store_day', 'store_id', 'day'),
+    )
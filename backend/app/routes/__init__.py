@@ -12,6 +12,7 @@ from .subscriptions import subscriptions_bp
 from .notifications import bp as notifications_bp
 from .wishlist import bp as wishlist_bp
 from .reports import reports_bp
+from .cart import bp as cart_bp
 
 # Re-export blueprints for easier import
 auth = auth_bp
@@ -28,10 +29,11 @@ subscriptions = subscriptions_bp
 notifications = notifications_bp
 wishlist = wishlist_bp
 reports = reports_bp
+cart = cart_bp
 
 __all__ = [
     'auth', 'users', 'stores', 'products', 'categories',
-    'orders', 'chat', 'reviews', 'admin', 'uploads', 'subscriptions', 'notifications', 'wishlist', 'reports'
+    'orders', 'chat', 'reviews', 'admin', 'uploads', 'subscriptions', 'notifications', 'wishlist', 'reports', 'cart'
 ]
 
 
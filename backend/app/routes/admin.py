@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from app import db, socketio
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
@@ -12,6 +12,7 @@ from app.models import (
     Category, Order, Report, AdsBanner, SmtpConfig, ActivityLog, Review, Notification, AdminRole, AppSettings
 )
 from app.services.email import send_smtp_email
+from app.services import admin_access, dashboard as dashboard_stats, exports, placements, ratings, tokens
 
 bp = Blueprint('admin', __name__)
 
@@ -21,11 +22,7 @@ def admin_required(f):
     @wraps(f)
     @jwt_required()
     def decorated(*args, **kwargs):
-        user_id = get_jwt_identity()
-        # Convert string identity to int for database query
-        user = User.query.get(int(user_id))
-        
-        if not user or user.role not in [UserRole.ADMIN.value, UserRole.SUPER_ADMIN.value, UserRole.SUPPORT_ADMIN.value]:
+        if tokens.claim('role') not in [UserRole.ADMIN.value, UserRole.SUPER_ADMIN.value, UserRole.SUPPORT_ADMIN.value]:
             return jsonify({'message': 'Admin access required'}), 403
         
         return f(*args, **kwargs)
@@ -37,11 +34,7 @@ def super_admin_required(f):
     @wraps(f)
     @jwt_required()
     def decorated(*args, **kwargs):
-        user_id = get_jwt_identity()
-        # Convert string identity to int for database query
-        user = User.query.get(int(user_id))
-        
-        if not user or user.role != UserRole.SUPER_ADMIN.value:
+        if tokens.claim('role') != UserRole.SUPER_ADMIN.value:
             return jsonify({'message': 'Super admin access required'}), 403
         
         return f(*args, **kwargs)
@@ -59,26 +52,9 @@ def slugify(text):
 @bp.route('/dashboard', methods=['GET'])
 @admin_required
 def dashboard():
-    """Get admin dashboard stats"""
-    total_users = User.query.filter_by(is_active=True).count()
-    total_sellers = User.query.filter_by(is_seller=True).count()
-    total_stores = Store.query.filter_by(is_active=True).count()
-    total_products = Product.query.filter_by(is_active=True).count()
-    total_orders = Order.query.count()
-    pending_requests = StoreRequest.query.filter_by(status=StoreRequestStatus.PENDING.value).count()
-    pending_reports = Report.query.filter_by(status='pending').count()
-    
-    return jsonify({
-        'stats': {
-            'total_users': total_users,
-            'total_sellers': total_sellers,
-            'total_stores': total_stores,
-            'total_products': total_products,
-            'total_orders': total_orders,
-            'pending_requests': pending_requests,
-            'pending_reports': pending_reports
-        }
-    }), 200
+    """Get admin dashboard stats and daily series"""
+    days = request.args.get('days', 30, type=int)
+    return jsonify(dashboard_stats.snapshot(days)), 200
 
 
 # User Management
@@ -105,6 +81,7 @@ def get_users():
     
     query = query.order_by(User.created_at.desc())
     pagination = query.paginate(page=page, per_page=limit, error_out=False)
+    admin_access.load(u.id for u in pagination.items if u.role == UserRole.SUPPORT_ADMIN.value)
     
     return jsonify({
         'users': [u.to_dict(include_sensitive=True) for u in pagination.items],
@@ -127,7 +104,9 @@ def toggle_user_status(user_id):
         return jsonify({'message': 'User not found'}), 404
     
     user.is_active = not user.is_active
+    tokens.revoke(user)
     db.session.commit()
+    admin_access.invalidate(user.id)
     
     status = 'activated' if user.is_active else 'suspended'
     return jsonify({
@@ -157,7 +136,9 @@ def update_user_role(user_id):
     if new_role in [UserRole.ADMIN.value, UserRole.SUPER_ADMIN.value]:
         user.is_seller = True
     
+    tokens.revoke(user)
     db.session.commit()
+    admin_access.invalidate(user.id)
     
     return jsonify({
         'message': 'Role updated successfully',
@@ -224,6 +205,7 @@ def admin_reset_user_password(user_id):
         return jsonify({'message': 'Password must be at least 6 characters'}), 400
     
     user.set_password(new_password)
+    tokens.revoke(user)
     db.session.commit()
     
     return jsonify({'message': f'Password reset successfully for {user.email}'}), 200
@@ -303,6 +285,7 @@ def approve_store_request(request_id):
     if user:
         user.is_seller = True
         user.role = UserRole.SELLER.value
+        tokens.revoke(user)
     
     # 4. Create notification for the user
     notification = Notification(
@@ -316,6 +299,7 @@ def approve_store_request(request_id):
     
     # Commit all changes atomically
     db.session.commit()
+    admin_access.invalidate(store_request.user_id)
     
     return jsonify({
         'message': 'Store request approved',
@@ -447,6 +431,37 @@ def delete_category(category_id):
 
 
 # Reports Management
+
+# entity type -> (model, relationships to eager load, label for a live row, label for a missing one).
+# Relationships are named, not referenced: backrefs such as Review.author only exist once mappers are configured.
+_REPORTED_ENTITIES = {
+    'product': (Product, (), lambda p: p.title, "Deleted Product"),
+    'store': (Store, (), lambda s: s.name, "Deleted Store"),
+    'user': (User, (), lambda u: f"{u.first_name} {u.last_name}", "Deleted User"),
+    'review': (Review, ('author',),
+               lambda rv: f"Review by {rv.author.first_name}" if rv.author else "Deleted Review", "Deleted Review"),
+}
+
+
+def _reported_item_names(reports):
+    """Display names of reported entities, keyed by (entity_type, entity_id). One IN query per type."""
+    ids_by_type = {}
+    for r in reports:
+        ids_by_type.setdefault(r.entity_type, set()).add(r.entity_id)
+
+    names = {}
+    for entity_type, ids in ids_by_type.items():
+        if entity_type not in _REPORTED_ENTITIES:
+            continue
+        model, relationships, label, missing = _REPORTED_ENTITIES[entity_type]
+        options = [db.joinedload(getattr(model, name)) for name in relationships]
+        found = {row.id: row for row in model.query.options(*options).filter(model.id.in_(ids))}
+        for entity_id in ids:
+            row = found.get(entity_id)
+            names[(entity_type, entity_id)] = label(row) if row else missing
+    return names
+
+
 @bp.route('/reports', methods=['GET'])
 @admin_required
 def get_reports():
@@ -455,32 +470,19 @@ def get_reports():
     limit = request.args.get('limit', 20, type=int)
     status = request.args.get('status', 'pending')
     
-    query = Report.query.filter_by(status=status).order_by(Report.created_at.desc())
+    query = Report.query.options(db.joinedload(Report.reporter)).filter_by(status=status).order_by(Report.created_at.desc())
     pagination = query.paginate(page=page, per_page=limit, error_out=False)
+    names = _reported_item_names(pagination.items)
+    admin_access.load(r.reporter_id for r in pagination.items)
     
     reports_data = []
     for r in pagination.items:
-        # Get reported item name
-        reported_item_name = "Unknown"
-        if r.entity_type == 'product':
-            p = Product.query.get(r.entity_id)
-            reported_item_name = p.title if p else "Deleted Product"
-        elif r.entity_type == 'store':
-            s = Store.query.get(r.entity_id)
-            reported_item_name = s.name if s else "Deleted Store"
-        elif r.entity_type == 'user':
-            u = User.query.get(r.entity_id)
-            reported_item_name = f"{u.first_name} {u.last_name}" if u else "Deleted User"
-        elif r.entity_type == 'review':
-            rv = Review.query.get(r.entity_id)
-            reported_item_name = f"Review by {rv.user.first_name}" if rv and rv.user else "Deleted Review"
-
         data = {
             'id': r.id,
             'reporter': r.reporter.to_dict() if r.reporter else None,
             'report_type': r.entity_type,  # Align with frontend
             'reported_id': r.entity_id,    # Align with frontend
-            'reported_item_name': reported_item_name,
+            'reported_item_name': names.get((r.entity_type, r.entity_id), 'Unknown'),
             'reason': r.reason,
             'description': r.description,
             'status': r.status,
@@ -742,6 +744,24 @@ def get_orders():
     }), 200
 
 
+@bp.route('/export/<string:entity>', methods=['GET'])
+@admin_required
+def export_list(entity):
+    """Stream users, stores or orders as CSV or NDJSON (?format=csv|ndjson, same filters as the lists)"""
+    if entity not in exports.EXPORTS:
+        return jsonify({'message': f"Unknown export. Use one of: {', '.join(exports.EXPORTS)}"}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return jsonify({'message': 'format must be csv or ndjson'}), 400
+    
+    filename = f"{entity}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(
+        stream_with_context(exports.stream(entity, fmt, request.args)),
+        mimetype=exports.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
 # Reviews Management
 @bp.route('/reviews', methods=['GET'])
 @admin_required
@@ -772,7 +792,9 @@ def toggle_review_hidden(review_id):
     if not review:
         return jsonify({'message': 'Review not found'}), 404
     
+    was_visible = ratings.is_visible(review)
     review.is_hidden = not review.is_hidden
+    ratings.visibility_changed(review, was_visible)
     db.session.commit()
     
     return jsonify({
@@ -835,6 +857,7 @@ def create_ad():
     )
     db.session.add(ad)
     db.session.commit()
+    placements.invalidate()
     return jsonify({'message': 'Ad created', 'ad': {
         'id': ad.id, 'title': ad.title, 'image_url': ad.image_url,
         'link_url': ad.link_url, 'position': ad.position, 'is_active': ad.is_active
@@ -866,6 +889,7 @@ def update_ad(ad_id):
             ad.image_url = upload_file(file, filename, folder='ads')
     
     db.session.commit()
+    placements.invalidate()
     return jsonify({'message': 'Ad updated', 'ad': {
         'id': ad.id, 'title': ad.title, 'image_url': ad.image_url,
         'link_url': ad.link_url, 'position': ad.position, 'is_active': ad.is_active
@@ -885,6 +909,7 @@ def patch_ad(ad_id):
         ad.is_active = data['is_active']
     
     db.session.commit()
+    placements.invalidate()
     return jsonify({'message': 'Ad updated'}), 200
 
 
@@ -898,6 +923,7 @@ def delete_ad(ad_id):
     
     db.session.delete(ad)
     db.session.commit()
+    placements.invalidate()
     return jsonify({'message': 'Ad deleted'}), 200
 
 @bp.route('/products/<int:product_id>', methods=['PATCH'])
@@ -915,6 +941,7 @@ def update_product_admin(product_id):
         product.is_featured = data['is_featured']
     
     db.session.commit()
+    placements.invalidate()
     return jsonify({'message': 'Product updated', 'product': product.to_dict()}), 200
 
 
@@ -930,15 +957,9 @@ VALID_PERMISSIONS = [
 def get_support_admins():
     """Get all support admin users"""
     support_admins = User.query.filter_by(role=UserRole.SUPPORT_ADMIN.value).all()
+    admin_access.load(sa.id for sa in support_admins)
     
-    result = []
-    for sa in support_admins:
-        data = sa.to_dict()
-        admin_role = AdminRole.query.filter_by(user_id=sa.id).first()
-        data['permissions'] = admin_role.permissions if admin_role else []
-        result.append(data)
-    
-    return jsonify({'support_admins': result}), 200
+    return jsonify({'support_admins': [sa.to_dict() for sa in support_admins]}), 200
 
 
 @bp.route('/support-admins', methods=['POST'])
@@ -987,6 +1008,7 @@ def create_support_admin():
     )
     db.session.add(admin_role)
     db.session.commit()
+    admin_access.invalidate(user.id)
     
     result = user.to_dict()
     result['permissions'] = permissions
@@ -1020,10 +1042,12 @@ def update_support_admin(user_id):
         )
         db.session.add(admin_role)
     
-    if 'is_active' in data:
+    if 'is_active' in data and data['is_active'] != user.is_active:
         user.is_active = data['is_active']
+        tokens.revoke(user)
     
     db.session.commit()
+    admin_access.invalidate(user.id)
     
     result = user.to_dict()
     result['permissions'] = permissions
@@ -1043,7 +1067,9 @@ def delete_support_admin(user_id):
     
     # Revert to regular user
     user.role = UserRole.USER.value
+    tokens.revoke(user)
     db.session.commit()
+    admin_access.invalidate(user.id)
     
     return jsonify({'message': 'Support admin removed'}), 200
 
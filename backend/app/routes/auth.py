@@ -1,23 +1,17 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
-import random
-import string
+from flask_jwt_extended import jwt_required, get_jwt_identity
 import traceback
 
 from app import db
-from app.models import User, OtpLog, AppSettings
+from app.models import User, AppSettings
+from app.services import otp, passwords, rate_limit, tokens
 from app.services.email import send_otp_email
 
 bp = Blueprint('auth', __name__)
 
 
-def generate_otp():
-    """Generate a 6-digit OTP"""
-    return ''.join(random.choices(string.digits, k=6))
-
-
 @bp.route('/register', methods=['POST'])
+@rate_limit.limit('register')
 def register():
     """Register a new user"""
     data = request.get_json()
@@ -72,18 +66,11 @@ def register():
     
     if require_verification:
         # Generate and send OTP
-        otp = generate_otp()
-        otp_log = OtpLog(
-            email=user.email,
-            otp_code=otp,
-            purpose='verification',
-            expires_at=datetime.utcnow() + timedelta(minutes=10)
-        )
-        db.session.add(otp_log)
+        otp_code = otp.issue(user.email, otp.VERIFICATION)
         db.session.commit()
         
         # Send OTP email (also prints to console)
-        send_otp_email(user.email, otp, 'Email Verification')
+        send_otp_email(user.email, otp_code, 'Email Verification')
         
         return jsonify({
             'message': 'Registration successful. Please verify your email.',
@@ -104,26 +91,15 @@ def verify_otp():
     data = request.get_json()
     
     email = data.get('email', '').lower()
-    otp = data.get('otp', '')
+    code = data.get('otp', '')
     
-    if not email or not otp:
+    if not email or not code:
         return jsonify({'message': 'Email and OTP are required'}), 400
     
-    # Find valid OTP
-    otp_log = OtpLog.query.filter(
-        OtpLog.email == email,
-        OtpLog.otp_code == otp,
-        OtpLog.purpose == 'verification',
-        OtpLog.is_used == False,
-        OtpLog.expires_at > datetime.utcnow()
-    ).first()
-    
-    if not otp_log:
+    # Find a valid OTP and mark it as used
+    if not otp.consume(email, code, otp.VERIFICATION):
         return jsonify({'message': 'Invalid or expired OTP'}), 400
     
-    # Mark OTP as used
-    otp_log.is_used = True
-    
     # Verify user
     user = User.query.filter_by(email=email).first()
     if user:
@@ -135,6 +111,7 @@ def verify_otp():
 
 
 @bp.route('/resend-otp', methods=['POST'])
+@rate_limit.limit('resend-otp')
 def resend_otp():
     """Resend OTP to email"""
     data = request.get_json()
@@ -150,23 +127,17 @@ def resend_otp():
     if user.is_verified:
         return jsonify({'message': 'Email already verified'}), 400
     
-    # Generate new OTP
-    otp = generate_otp()
-    otp_log = OtpLog(
-        email=email,
-        otp_code=otp,
-        purpose='verification',
-        expires_at=datetime.utcnow() + timedelta(minutes=10)
-    )
-    db.session.add(otp_log)
+    # Generate new OTP; earlier codes stop working
+    otp_code = otp.issue(email, otp.VERIFICATION)
     db.session.commit()
     
-    send_otp_email(email, otp, 'Email Verification')
+    send_otp_email(email, otp_code, 'Email Verification')
     
     return jsonify({'message': 'OTP sent to your email'}), 200
 
 
 @bp.route('/login', methods=['POST'])
+@rate_limit.limit('login')
 def login():
     """Login with email/student_id and password"""
     data = request.get_json()
@@ -185,6 +156,11 @@ def login():
     if not user or not user.check_password(password):
         return jsonify({'message': 'Invalid credentials'}), 401
     
+    # Upgrade hashes made at an old cost while we have the plaintext
+    if passwords.needs_rehash(user.password_hash):
+        user.set_password(password)
+        db.session.commit()
+    
     if not user.is_verified:
         # Check if email verification is required
         require_verification = True
@@ -197,16 +173,9 @@ def login():
         
         if require_verification:
             # Auto-send a new OTP so user can verify immediately
-            otp = generate_otp()
-            otp_log = OtpLog(
-                email=user.email,
-                otp_code=otp,
-                purpose='email_verification',
-                expires_at=datetime.utcnow() + timedelta(minutes=10)
-            )
-            db.session.add(otp_log)
+            otp_code = otp.issue(user.email, otp.VERIFICATION)
             db.session.commit()
-            send_otp_email(user.email, otp, 'Email Verification')
+            send_otp_email(user.email, otp_code, 'Email Verification')
             
             return jsonify({
                 'message': 'Please verify your email first. A new verification code has been sent.',
@@ -217,9 +186,8 @@ def login():
     if not user.is_active:
         return jsonify({'message': 'Your account has been suspended'}), 403
     
-    # Generate tokens - identity MUST be a string for Flask-JWT-Extended
-    access_token = create_access_token(identity=str(user.id))
-    refresh_token = create_refresh_token(identity=str(user.id))
+    # Generate tokens; the access token carries role/seller claims
+    access_token, refresh_token = tokens.issue(user)
     
     return jsonify({
         'message': 'Login successful',
@@ -236,8 +204,11 @@ def refresh():
     print(f"DEBUG: Refresh endpoint hit. Headers: {request.headers}")
     current_user_id = get_jwt_identity()
     print(f"DEBUG: Refresh success. User ID: {current_user_id}")
-    # Identity is already a string, pass it directly to create new token
-    access_token = create_access_token(identity=current_user_id)
+    # Reload the user so the new token carries current claims
+    user = User.query.get(int(current_user_id))
+    if not user or not user.is_active:
+        return jsonify({'message': 'Your account has been suspended', 'error': 'account_suspended'}), 401
+    access_token = tokens.access_token(user)
     
     return jsonify({
         'access_token': access_token
@@ -245,6 +216,7 @@ def refresh():
 
 
 @bp.route('/forgot-password', methods=['POST'])
+@rate_limit.limit('forgot-password')
 def forgot_password():
     """Request password reset OTP"""
     data = request.get_json()
@@ -259,17 +231,10 @@ def forgot_password():
         return jsonify({'message': 'If this email exists, you will receive a reset code'}), 200
     
     # Generate OTP
-    otp = generate_otp()
-    otp_log = OtpLog(
-        email=email,
-        otp_code=otp,
-        purpose='password_reset',
-        expires_at=datetime.utcnow() + timedelta(minutes=10)
-    )
-    db.session.add(otp_log)
+    otp_code = otp.issue(email, otp.PASSWORD_RESET)
     db.session.commit()
     
-    send_otp_email(email, otp, 'Password Reset')
+    send_otp_email(email, otp_code, 'Password Reset')
     
     return jsonify({'message': 'If this email exists, you will receive a reset code'}), 200
 
@@ -280,25 +245,17 @@ def reset_password():
     data = request.get_json()
     
     email = data.get('email', '').lower()
-    otp = data.get('otp', '')
+    code = data.get('otp', '')
     new_password = data.get('new_password', '')
     
-    if not email or not otp or not new_password:
+    if not email or not code or not new_password:
         return jsonify({'message': 'Email, OTP, and new password are required'}), 400
     
     if len(new_password) < 8:
         return jsonify({'message': 'Password must be at least 8 characters'}), 400
     
-    # Find valid OTP
-    otp_log = OtpLog.query.filter(
-        OtpLog.email == email,
-        OtpLog.otp_code == otp,
-        OtpLog.purpose == 'password_reset',
-        OtpLog.is_used == False,
-        OtpLog.expires_at > datetime.utcnow()
-    ).first()
-    
-    if not otp_log:
+    # Find a valid OTP and mark it as used
+    if not otp.consume(email, code, otp.PASSWORD_RESET):
         return jsonify({'message': 'Invalid or expired OTP'}), 400
     
     # Update password
@@ -307,7 +264,7 @@ def reset_password():
         return jsonify({'message': 'User not found'}), 404
     
     user.set_password(new_password)
-    otp_log.is_used = True
+    tokens.revoke(user)
     db.session.commit()
     
     return jsonify({'message': 'Password reset successful'}), 200
@@ -0,0 +1,239 @@
+from collections import OrderedDict
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app import db
+from app.models import CartItem, Product, Order, OrderItem, OrderStatus, User
+from app.services import analytics, inventory, notify
+from app.services.idempotency import idempotent
+from .orders import generate_order_number
+
+bp = Blueprint('cart', __name__)
+
+
+def _cart_items(user_id):
+    return CartItem.query.options(
+        db.joinedload(CartItem.product).joinedload(Product.store),
+        db.joinedload(CartItem.product).selectinload(Product.media),
+    ).filter_by(user_id=user_id).order_by(CartItem.created_at).all()
+
+
+def _valid_quantity(quantity):
+    return isinstance(quantity, int) and not isinstance(quantity, bool) and quantity >= 1
+
+
+@bp.route('', methods=['GET'])
+@jwt_required()
+def get_cart():
+    """Get the cart grouped by store"""
+    user_id = int(get_jwt_identity())
+
+    stores = OrderedDict()
+    total = 0
+    for item in _cart_items(user_id):
+        product = item.product
+        line_total = float(product.price) * item.quantity
+        total += line_total
+        group = stores.setdefault(product.store_id, {
+            'store': {'id': product.store.id, 'name': product.store.name, 'slug': product.store.slug},
+            'items': [],
+            'subtotal': 0,
+        })
+        group['items'].append({
+            'id': item.id,
+            'product_id': product.id,
+            'quantity': item.quantity,
+            'line_total': line_total,
+            'is_available': bool(product.is_active and product.is_in_stock and product.stock_quantity >= item.quantity),
+            'product': {
+                'id': product.id,
+                'title': product.title,
+                'slug': product.slug,
+                'price': float(product.price),
+                'stock_quantity': product.stock_quantity,
+                'media': [m.to_dict() for m in product.media[:1]],
+            },
+        })
+        group['subtotal'] += line_total
+
+    return jsonify({'stores': list(stores.values()), 'total': total}), 200
+
+
+@bp.route('/items', methods=['POST'])
+@jwt_required()
+def add_to_cart():
+    """Add a product to the cart (increments the quantity if already there)"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    product_id = data.get('product_id')
+    quantity = data.get('quantity', 1)
+
+    if not product_id:
+        return jsonify({'message': 'product_id is required'}), 400
+    if not _valid_quantity(quantity):
+        return jsonify({'message': 'Invalid quantity'}), 400
+
+    product = Product.query.get(product_id)
+    if not product or not product.is_active:
+        return jsonify({'message': 'Product not found'}), 404
+    if product.store.owner_id == user_id:
+        return jsonify({'message': 'You cannot buy your own products'}), 400
+
+    item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
+    if item:
+        item.quantity += quantity
+    else:
+        item = CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
+        db.session.add(item)
+
+    if not product.is_in_stock or product.stock_quantity < item.quantity:
+        db.session.rollback()
+        return jsonify({'message': 'Not enough stock'}), 400
+
+    db.session.commit()
+    return jsonify({'message': 'Added to cart', 'id': item.id, 'quantity': item.quantity}), 201
+
+
+@bp.route('/items/<int:product_id>', methods=['PUT'])
+@jwt_required()
+def update_cart_item(product_id):
+    """Set the quantity of a cart item"""
+    user_id = int(get_jwt_identity())
+    quantity = (request.get_json() or {}).get('quantity')
+
+    if not _valid_quantity(quantity):
+        return jsonify({'message': 'Invalid quantity'}), 400
+
+    item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
+    if not item:
+        return jsonify({'message': 'Item not in cart'}), 404
+
+    if item.product.stock_quantity < quantity:
+        return jsonify({'message': 'Not enough stock'}), 400
+
+    item.quantity = quantity
+    db.session.commit()
+    return jsonify({'message': 'Cart updated', 'quantity': item.quantity}), 200
+
+
+@bp.route('/items/<int:product_id>', methods=['DELETE'])
+@jwt_required()
+def remove_from_cart(product_id):
+    """Remove a product from the cart"""
+    user_id = int(get_jwt_identity())
+
+    deleted = CartItem.query.filter_by(user_id=user_id, product_id=product_id).delete()
+    if not deleted:
+        return jsonify({'message': 'Item not in cart'}), 404
+
+    db.session.commit()
+    return jsonify({'message': 'Item removed from cart'}), 200
+
+
+@bp.route('', methods=['DELETE'])
+@jwt_required()
+def clear_cart():
+    """Empty the cart"""
+    user_id = int(get_jwt_identity())
+    CartItem.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+    return jsonify({'message': 'Cart cleared'}), 200
+
+
+@bp.route('/checkout', methods=['POST'])
+@jwt_required()
+@idempotent
+def checkout():
+    """Place one order per store for everything in the cart, in a single transaction"""
+    user_id = int(get_jwt_identity())
+    buyer_note = (request.get_json(silent=True) or {}).get('buyer_note', '')
+
+    items = _cart_items(user_id)
+    if not items:
+        return jsonify({'message': 'Your cart is empty'}), 400
+
+    unavailable = [item.product_id for item in items if not item.product.is_active or not item.product.is_in_stock]
+    if unavailable:
+        return jsonify({'message': 'Some items are no longer available', 'product_ids': unavailable}), 400
+    if any(item.product.store.owner_id == user_id for item in items):
+        return jsonify({'message': 'You cannot buy your own products'}), 400
+
+    # One order per store; the first line doubles as the order's headline product
+    by_store = OrderedDict()
+    for item in items:
+        by_store.setdefault(item.product.store_id, []).append(item)
+
+    orders = []
+    for store_id, lines in by_store.items():
+        first = lines[0].product
+        orders.append(Order(
+            order_number=generate_order_number(),
+            buyer_id=user_id,
+            store_id=store_id,
+            product_id=first.id,
+            quantity=sum(line.quantity for line in lines),
+            unit_price=first.price,
+            total_price=sum(line.product.price * line.quantity for line in lines),
+            buyer_note=buyer_note,
+            status=OrderStatus.PENDING_PAYMENT.value,
+        ))
+    db.session.add_all(orders)
+    db.session.flush()
+
+    rows = [
+        {
+            'order_id': order.id,
+            'product_id': line.product_id,
+            'quantity': line.quantity,
+            'unit_price': line.product.price,
+            'total_price': line.product.price * line.quantity,
+        }
+        for order, lines in zip(orders, by_store.values())
+        for line in lines
+    ]
+    db.session.execute(db.insert(OrderItem), rows)
+
+    # Hold stock for every line in one statement
+    try:
+        inventory.reserve(
+            [(row['order_id'], row['product_id'], row['quantity']) for row in rows],
+            expires_at=inventory.hold_expiry(),
+        )
+    except inventory.InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'message': 'Some items are out of stock', 'product_ids': e.product_ids}), 409
+
+    analytics.record(orders, OrderStatus.PENDING_PAYMENT.value)
+    CartItem.query.filter_by(user_id=user_id).delete()
+
+    # One notification per seller
+    buyer = User.query.get(user_id)
+    notifications = []
+    for order, lines in zip(orders, by_store.values()):
+        count = sum(line.quantity for line in lines)
+        notifications.append(notify.build(
+            user_id=lines[0].product.store.owner_id,
+            title='New Order! 🛒',
+            message=f'{buyer.first_name} placed an order for {count} item(s). Total: ₦{float(order.total_price):,.0f}',
+            data={'order_id': order.id},
+        ))
+    db.session.commit()
+    notify.emit(notifications)
+
+    # Return orders with seller bank details
+    results = []
+    for order, lines in zip(orders, by_store.values()):
+        store = lines[0].product.store
+        data = order.to_dict(include_details=True)
+        data['bank_details'] = {
+            'bank_name': store.bank_name,
+            'account_number': store.account_number,
+            'account_name': store.account_name,
+        }
+        results.append(data)
+
+    return jsonify({
+        'message': 'Orders created. Please complete payment for each store.',
+        'orders': results,
+    }), 201
@@ -4,6 +4,7 @@ from datetime import datetime
 
 from app import db, socketio
 from app.models import Chat, Message, User, Product, Notification
+from app.services import chats, fieldsets
 
 bp = Blueprint('chat', __name__)
 
@@ -36,13 +37,14 @@ def create_notification(user_id, title, message, notification_type='chat', data=
 def get_conversations():
     """Get user's chat conversations"""
     user_id = int(get_jwt_identity())
+    fieldset = fieldsets.from_request()
     
-    chats = Chat.query.filter(
+    chats = Chat.query.options(*Chat.load_options(fieldset)).filter(
         (Chat.user1_id == user_id) | (Chat.user2_id == user_id)
     ).order_by(Chat.last_message_at.desc()).all()
     
     return jsonify({
-        'conversations': [c.to_dict(current_user_id=user_id) for c in chats]
+        'conversations': [c.to_dict(current_user_id=user_id, fieldset=fieldset) for c in chats]
     }), 200
 
 
@@ -53,6 +55,7 @@ def get_chat_messages(chat_id):
     user_id = int(get_jwt_identity())
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 50, type=int)
+    fieldset = fieldsets.from_request()
     
     chat = Chat.query.get(chat_id)
     
@@ -64,7 +67,8 @@ def get_chat_messages(chat_id):
         return jsonify({'message': 'Unauthorized'}), 403
     
     # Get messages
-    messages = Message.query.filter_by(chat_id=chat_id).order_by(
+    sender_options = [db.joinedload(Message.sender)] if fieldset is None or fieldset.includes('sender') else []
+    messages = Message.query.options(*sender_options).filter_by(chat_id=chat_id).order_by(
         Message.created_at.desc()
     ).paginate(page=page, per_page=limit, error_out=False)
     
@@ -78,7 +82,7 @@ def get_chat_messages(chat_id):
     
     return jsonify({
         'chat': chat.to_dict(current_user_id=user_id),
-        'messages': [m.to_dict() for m in reversed(messages.items)],
+        'messages': [m.to_dict(fieldset=fieldset) for m in reversed(messages.items)],
         'pagination': {
             'page': page,
             'limit': limit,
@@ -104,19 +108,9 @@ def start_chat():
     if seller_id == user_id:
         return jsonify({'message': 'Cannot chat with yourself'}), 400
     
-    # Check if chat exists
-    chat = Chat.query.filter(
-        ((Chat.user1_id == user_id) & (Chat.user2_id == seller_id)) |
-        ((Chat.user1_id == seller_id) & (Chat.user2_id == user_id))
-    ).first()
-    
-    if not chat:
-        chat = Chat(
-            user1_id=user_id,
-            user2_id=seller_id,
-            product_id=product_id
-        )
-        db.session.add(chat)
+    # Get or create the chat for this pair of users
+    chat, created = chats.get_or_create(user_id, seller_id, product_id=product_id)
+    if created:
         db.session.commit()
     
     return jsonify({
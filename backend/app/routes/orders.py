@@ -4,7 +4,9 @@ from datetime import datetime
 import uuid
 
 from app import db, socketio
-from app.models import Order, OrderStatus, Product, Store, User, Chat, Message, Notification
+from app.models import Order, OrderItem, OrderStatus, Product, Store, User, Message, Notification
+from app.services import analytics, chats, fieldsets, inventory, notify, order_states
+from app.services.idempotency import idempotent
 
 bp = Blueprint('orders', __name__)
 
@@ -40,6 +42,25 @@ def create_notification(user_id, title, message, notification_type='order', data
     return notification
 
 
+def describe_items(order):
+    """Product/quantity lines for receipt messages"""
+    if not order.items:
+        product = Product.query.get(order.product_id)
+        return f"Product: {product.title}\nQuantity: {order.quantity}"
+    return "Items:\n" + "\n".join(
+        f"- {item.product.title} ×{item.quantity} (₦{float(item.total_price):,.2f})" for item in order.items
+    )
+
+
+def status_message_content(order, action, reason=None):
+    """Chat message sent to the buyer when the seller approves or rejects an order"""
+    if action == 'approve':
+        return (f"✅ PAYMENT APPROVED\n\nOrder #{order.order_number} has been approved!\n\n"
+                "Your order is ready for pickup. Please contact the seller to arrange pickup.")
+    return (f"❌ PAYMENT REJECTED\n\nOrder #{order.order_number} has been rejected.\n\n"
+            f"Reason: {reason}\n\nPlease contact the seller for more information.")
+
+
 def emit_order_status_update(order, buyer_id, seller_id):
     """Emit order status update to both buyer and seller"""
     order_data = order.to_dict(include_details=True)
@@ -67,8 +88,9 @@ def get_my_orders():
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
     status = request.args.get('status')
+    fieldset = fieldsets.from_request()
     
-    query = Order.query.filter_by(buyer_id=user_id)
+    query = Order.query.options(*Order.load_options(fieldset, include_details=True)).filter_by(buyer_id=user_id)
     
     if status:
         query = query.filter_by(status=status)
@@ -77,7 +99,7 @@ def get_my_orders():
     pagination = query.paginate(page=page, per_page=limit, error_out=False)
     
     return jsonify({
-        'orders': [o.to_dict(include_details=True) for o in pagination.items],
+        'orders': [o.to_dict(include_details=True, fieldset=fieldset) for o in pagination.items],
         'pagination': {
             'page': page,
             'limit': limit,
@@ -100,8 +122,9 @@ def get_seller_orders():
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
     status = request.args.get('status')
+    fieldset = fieldsets.from_request()
     
-    query = Order.query.filter_by(store_id=store.id)
+    query = Order.query.options(*Order.load_options(fieldset, include_details=True)).filter_by(store_id=store.id)
     
     if status:
         query = query.filter_by(status=status)
@@ -110,7 +133,7 @@ def get_seller_orders():
     pagination = query.paginate(page=page, per_page=limit, error_out=False)
     
     return jsonify({
-        'orders': [o.to_dict(include_details=True) for o in pagination.items],
+        'orders': [o.to_dict(include_details=True, fieldset=fieldset) for o in pagination.items],
         'pagination': {
             'page': page,
             'limit': limit,
@@ -134,11 +157,12 @@ def get_order(order_id):
     if order.buyer_id != user_id and order.store.owner_id != user_id:
         return jsonify({'message': 'Unauthorized'}), 403
     
-    return jsonify({'order': order.to_dict(include_details=True)}), 200
+    return jsonify({'order': order.to_dict(include_details=True, fieldset=fieldsets.from_request())}), 200
 
 
 @bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_order():
     """Create a new order (manual payment flow)"""
     user_id = int(get_jwt_identity())
@@ -153,6 +177,9 @@ def create_order():
     if not product or not product.is_active:
         return jsonify({'message': 'Product not found'}), 404
     
+    if not isinstance(quantity, int) or quantity < 1:
+        return jsonify({'message': 'Invalid quantity'}), 400
+    
     if not product.is_in_stock or product.stock_quantity < quantity:
         return jsonify({'message': 'Product out of stock'}), 400
     
@@ -177,6 +204,15 @@ def create_order():
     )
     
     db.session.add(order)
+    db.session.flush()
+    
+    # Hold the stock until the payment window closes
+    try:
+        inventory.reserve_order(order)
+    except inventory.InsufficientStock:
+        db.session.rollback()
+        return jsonify({'message': 'Product out of stock'}), 400
+    analytics.record([order], OrderStatus.PENDING_PAYMENT.value)
     db.session.commit()
     
     # Notify seller of new order
@@ -206,50 +242,39 @@ def create_order():
 
 @bp.route('/<int:order_id>/confirm-payment', methods=['POST'])
 @jwt_required()
+@idempotent
 def confirm_payment(order_id):
     """Buyer confirms they have made payment"""
     user_id = int(get_jwt_identity())
-    order = Order.query.get(order_id)
+    order = order_states.locked(Order.query.filter_by(id=order_id)).first()
     
     if not order:
         return jsonify({'message': 'Order not found'}), 404
     
-    if order.buyer_id != user_id:
-        return jsonify({'message': 'Unauthorized'}), 403
+    try:
+        order_states.guard(order, 'confirm_payment', user_id)
+    except order_states.InvalidTransition as e:
+        return jsonify({'message': e.message}), e.status_code
     
-    if order.status != OrderStatus.PENDING_PAYMENT.value:
-        return jsonify({'message': 'Invalid order status'}), 400
+    # Update status, keeping the stock held while the seller verifies the payment
+    try:
+        order_states.apply([order], 'confirm_payment')
+    except inventory.InsufficientStock:
+        db.session.rollback()
+        return jsonify({'message': 'Your reservation expired and the product is now out of stock'}), 409
     
-    # Update status
-    order.status = OrderStatus.AWAITING_APPROVAL.value
-    order.payment_confirmed_at = datetime.utcnow()
-    
-    # Get store and product info
+    # Get store and buyer info
     store = Store.query.get(order.store_id)
-    product = Product.query.get(order.product_id)
     buyer = User.query.get(user_id)
     
     # Find or create chat between buyer and store owner
-    chat = Chat.query.filter(
-        ((Chat.user1_id == user_id) & (Chat.user2_id == store.owner_id)) |
-        ((Chat.user1_id == store.owner_id) & (Chat.user2_id == user_id))
-    ).first()
-    
-    if not chat:
-        chat = Chat(
-            user1_id=user_id,
-            user2_id=store.owner_id,
-            product_id=order.product_id
-        )
-        db.session.add(chat)
-        db.session.flush()
+    chat, _ = chats.get_or_create(user_id, store.owner_id, product_id=order.product_id)
     
     # Create receipt message with order details
     receipt_content = f"""📧 PAYMENT RECEIPT
 
 Order: #{order.order_number}
-Product: {product.title}
-Quantity: {order.quantity}
+{describe_items(order)}
 Amount: ₦{float(order.total_price):,.2f}
 
 Status: Awaiting your approval
@@ -300,45 +325,32 @@ Please verify and approve/reject this payment."""
 def approve_order(order_id):
     """Seller approves an order after confirming payment"""
     user_id = int(get_jwt_identity())
-    order = Order.query.get(order_id)
+    order = order_states.locked(Order.query.filter_by(id=order_id)).first()
     
     if not order:
         return jsonify({'message': 'Order not found'}), 404
     
-    if order.store.owner_id != user_id:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
-    if order.status != OrderStatus.AWAITING_APPROVAL.value:
-        return jsonify({'message': 'Invalid order status'}), 400
+    try:
+        order_states.guard(order, 'approve', user_id)
+    except order_states.InvalidTransition as e:
+        return jsonify({'message': e.message}), e.status_code
     
-    # Update status
-    order.status = OrderStatus.APPROVED.value
-    order.approved_at = datetime.utcnow()
-    
-    # Update product stock
-    product = Product.query.get(order.product_id)
-    if product:
-        product.stock_quantity -= order.quantity
-        product.total_orders += 1
-        if product.stock_quantity <= 0:
-            product.is_in_stock = False
-    
-    # Update store total orders
-    store = order.store
-    store.total_orders += 1
+    # Update status, turn the stock hold into a sale and count the sale
+    try:
+        order_states.apply([order], 'approve')
+    except inventory.InsufficientStock:
+        db.session.rollback()
+        return jsonify({'message': 'Insufficient stock to approve this order'}), 409
     
     # Find chat between buyer and seller
-    chat = Chat.query.filter(
-        ((Chat.user1_id == order.buyer_id) & (Chat.user2_id == user_id)) |
-        ((Chat.user1_id == user_id) & (Chat.user2_id == order.buyer_id))
-    ).first()
+    chat = chats.find(order.buyer_id, user_id)
     
     if chat:
         # Send approval message to chat
         approval_message = Message(
             chat_id=chat.id,
             sender_id=user_id,
-            content=f"✅ PAYMENT APPROVED\n\nOrder #{order.order_number} has been approved!\n\nYour order is ready for pickup. Please contact the seller to arrange pickup.",
+            content=status_message_content(order, 'approve'),
             message_type='receipt',
             order_id=order.id
         )
@@ -379,35 +391,30 @@ def approve_order(order_id):
 def reject_order(order_id):
     """Seller rejects an order"""
     user_id = int(get_jwt_identity())
-    order = Order.query.get(order_id)
+    order = order_states.locked(Order.query.filter_by(id=order_id)).first()
     data = request.get_json() or {}
     
     if not order:
         return jsonify({'message': 'Order not found'}), 404
     
-    if order.store.owner_id != user_id:
-        return jsonify({'message': 'Unauthorized'}), 403
+    try:
+        order_states.guard(order, 'reject', user_id)
+    except order_states.InvalidTransition as e:
+        return jsonify({'message': e.message}), e.status_code
     
-    if order.status != OrderStatus.AWAITING_APPROVAL.value:
-        return jsonify({'message': 'Invalid order status'}), 400
-    
-    # Update status
+    # Update status and release the held stock
     reason = data.get('reason', 'Payment not confirmed')
-    order.status = OrderStatus.REJECTED.value
-    order.seller_note = reason
+    order_states.apply([order], 'reject', reason=reason)
     
     # Find chat between buyer and seller
-    chat = Chat.query.filter(
-        ((Chat.user1_id == order.buyer_id) & (Chat.user2_id == user_id)) |
-        ((Chat.user1_id == user_id) & (Chat.user2_id == order.buyer_id))
-    ).first()
+    chat = chats.find(order.buyer_id, user_id)
     
     if chat:
         # Send rejection message to chat
         rejection_message = Message(
             chat_id=chat.id,
             sender_id=user_id,
-            content=f"❌ PAYMENT REJECTED\n\nOrder #{order.order_number} has been rejected.\n\nReason: {reason}\n\nPlease contact the seller for more information.",
+            content=status_message_content(order, 'reject', reason),
             message_type='receipt',
             order_id=order.id
         )
@@ -448,19 +455,17 @@ def reject_order(order_id):
 def complete_order(order_id):
     """Mark order as completed (buyer received the item)"""
     user_id = int(get_jwt_identity())
-    order = Order.query.get(order_id)
+    order = order_states.locked(Order.query.filter_by(id=order_id)).first()
     
     if not order:
         return jsonify({'message': 'Order not found'}), 404
     
-    if order.buyer_id != user_id:
-        return jsonify({'message': 'Unauthorized'}), 403
+    try:
+        order_states.guard(order, 'complete', user_id)
+    except order_states.InvalidTransition as e:
+        return jsonify({'message': e.message}), e.status_code
     
-    if order.status != OrderStatus.APPROVED.value:
-        return jsonify({'message': 'Invalid order status'}), 400
-    
-    order.status = OrderStatus.COMPLETED.value
-    order.completed_at = datetime.utcnow()
+    order_states.apply([order], 'complete')
     
     # Notify seller of order completion
     buyer = User.query.get(user_id)
@@ -481,3 +486,113 @@ def complete_order(order_id):
         'message': 'Order completed. Please leave a review!',
         'order': order.to_dict(include_details=True)
     }), 200
+
+
+BULK_ACTIONS = {
+    'approve': ('Payment Approved! ✅', 'approved'),
+    'reject': ('Payment Rejected ❌', 'rejected'),
+    'complete': ('Order Completed ✅', 'completed'),
+}
+BULK_LIMIT = 100
+
+
+@bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_update_orders():
+    """Approve, reject (seller) or complete (buyer) many orders in one transaction"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    action = data.get('action')
+    order_ids = data.get('order_ids') or []
+    reason = data.get('reason', 'Payment not confirmed')
+    
+    if action not in BULK_ACTIONS:
+        return jsonify({'message': 'action must be one of: approve, reject, complete'}), 400
+    if not isinstance(order_ids, list) or not all(isinstance(i, int) for i in order_ids):
+        return jsonify({'message': 'order_ids must be a list of order ids'}), 400
+    if not order_ids or len(order_ids) > BULK_LIMIT:
+        return jsonify({'message': f'Provide between 1 and {BULK_LIMIT} order ids'}), 400
+    
+    orders = order_states.locked(Order.query.options(
+        db.joinedload(Order.store),
+        db.joinedload(Order.buyer),
+        db.selectinload(Order.items).joinedload(OrderItem.product),
+    ).filter(Order.id.in_(set(order_ids))).order_by(Order.id)).all()
+    
+    # Guard every order; the valid ones are processed together
+    found = {o.id for o in orders}
+    failed = [{'order_id': i, 'message': 'Order not found'} for i in dict.fromkeys(order_ids) if i not in found]
+    valid = []
+    for order in orders:
+        try:
+            order_states.guard(order, action, user_id)
+            valid.append(order)
+        except order_states.InvalidTransition as e:
+            failed.append({'order_id': order.id, 'message': e.message})
+    
+    if not valid:
+        return jsonify({'message': 'No orders could be updated', 'failed': failed}), 400
+    
+    try:
+        order_states.apply(valid, action, reason=reason)
+    except inventory.InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'message': 'Insufficient stock to approve these orders', 'product_ids': e.product_ids}), 409
+    
+    now = datetime.utcnow()
+    
+    # One chat message per order, chats resolved from the pair-key cache
+    messages = []
+    if action in ('approve', 'reject'):
+        for order in valid:
+            chat = chats.find(order.buyer_id, user_id)
+            if chat:
+                messages.append(Message(
+                    chat_id=chat.id,
+                    sender_id=user_id,
+                    content=status_message_content(order, action, reason),
+                    message_type='receipt',
+                    order_id=order.id
+                ))
+                chat.last_message_at = now
+        db.session.add_all(messages)
+    
+    # One notification per counterpart, covering all of their orders
+    title, verb = BULK_ACTIONS[action]
+    by_recipient = {}
+    for order in valid:
+        recipient = order.store.owner_id if action == 'complete' else order.buyer_id
+        by_recipient.setdefault(recipient, []).append(order)
+    notifications = []
+    for recipient, recipient_orders in by_recipient.items():
+        numbers = ', '.join(f'#{o.order_number}' for o in recipient_orders)
+        if len(recipient_orders) == 1:
+            message = f'Order {numbers} has been {verb}.'
+        else:
+            message = f'{len(recipient_orders)} orders have been {verb}: {numbers}'
+        if action == 'reject':
+            message += f' Reason: {reason}'
+        notifications.append(notify.build(
+            user_id=recipient,
+            title=title,
+            message=message,
+            data={'order_ids': [o.id for o in recipient_orders]}
+        ))
+    db.session.commit()
+    
+    # Coalesced real-time events: one batch per user, plus the chat messages
+    payloads = {o.id: o.to_dict(include_details=True) for o in valid}
+    notify.emit(notifications)
+    for recipient, recipient_orders in list(by_recipient.items()) + [(user_id, valid)]:
+        socketio.emit('order_status_batch', {
+            'status': order_states.TRANSITIONS[action].target,
+            'orders': [{'order_id': o.id, 'status': o.status, 'order': payloads[o.id]} for o in recipient_orders]
+        }, room=f'user_{recipient}')
+    for message in messages:
+        socketio.emit('new_message', message.to_dict(), room=f'chat_{message.chat_id}')
+    
+    return jsonify({
+        'message': f'{len(valid)} order(s) {verb}',
+        'orders': [payloads[o.id] for o in valid],
+        'failed': failed
+    }), 200
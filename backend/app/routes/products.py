@@ -1,16 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
 from datetime import datetime
 import os
 import re
 from werkzeug.utils import secure_filename
 from app.services.storage import upload_file
+from app.services import ad_server, etag, fieldsets, placements, product_query, ratings, tokens
 
 from app import db
-from app.models import Product, ProductMedia, Store, Category, User, ProductType, Review, Order, OrderStatus, AdsBanner
+from app.models import Product, ProductMedia, Store, Category, ProductType, Review, Order, OrderItem, OrderStatus
 
 bp = Blueprint('products', __name__)
 
+MAX_AD_SLOTS = 10
+
 
 def slugify(text):
     """Convert text to URL-friendly slug"""
@@ -22,50 +27,36 @@ def slugify(text):
 
 @bp.route('', methods=['GET'])
 def get_products():
-    """Get all active products with pagination"""
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 20, type=int)
-    product_type = request.args.get('type')
-    
-    query = Product.query.filter_by(is_active=True)
-    
-    if product_type:
-        query = query.filter_by(product_type=product_type)
+    """Get all active products with filters and pagination"""
+    fieldset = fieldsets.from_request()
+    pq = product_query.ProductQuery.from_request(request.args)
+    if pq.error:
+        return jsonify({'message': pq.error}), 400
     
-    query = query.order_by(Product.created_at.desc())
-    pagination = query.paginate(page=page, per_page=limit, error_out=False)
+    products, pagination = pq.paginate(pq.build(fieldset, include_store=True))
     
     return jsonify({
-        'products': [p.to_dict(include_store=True) for p in pagination.items],
-        'pagination': {
-            'page': page,
-            'limit': limit,
-            'total': pagination.total,
-            'pages': pagination.pages
-        }
+        'products': [p.to_dict(include_store=True, fieldset=fieldset) for p in products],
+        'pagination': pagination
     }), 200
 
 
 @bp.route('/ads', methods=['GET'])
 def get_ads():
-    """Get active and approved ad banners"""
+    """Get ads for a position, rotated and frequency-capped per viewer"""
     position = request.args.get('position')
-    now = datetime.utcnow()
-    
-    query = AdsBanner.query.filter(
-        AdsBanner.is_active == True,
-        AdsBanner.is_approved == True,
-        AdsBanner.starts_at <= now,
-        AdsBanner.ends_at >= now
-    )
+    slots = min(max(request.args.get('slots', 3, type=int), 1), MAX_AD_SLOTS)
     
-    if position:
-        query = query.filter_by(position=position)
-    
-    ads = query.order_by(AdsBanner.created_at.desc()).all()
+    # Signed-in viewers are capped per account; a bad token just counts as anonymous
+    try:
+        verify_jwt_in_request(optional=True)
+        viewer = get_jwt_identity()
+    except (JWTExtendedException, PyJWTError):
+        viewer = None
+    viewer = viewer or request.remote_addr
     
     return jsonify({
-        'ads': [a.to_dict() for a in ads]
+        'ads': ad_server.serve(position, slots, viewer)
     }), 200
 
 
@@ -73,77 +64,87 @@ def get_ads():
 def get_featured_products():
     """Get featured products for home page"""
     limit = request.args.get('limit', 10, type=int)
+    fieldset = fieldsets.from_request()
     
-    products = Product.query.filter_by(
-        is_active=True, 
-        is_featured=True
-    ).order_by(Product.created_at.desc()).limit(limit).all()
+    ids = placements.featured_ids(limit)
+    by_id = {p.id: p for p in Product.query.options(*Product.load_options(fieldset, include_store=True)).filter(
+        Product.id.in_(ids),
+        Product.is_active == True
+    )}
+    products = [by_id[i] for i in ids if i in by_id]
     
     return jsonify({
-        'products': [p.to_dict(include_store=True) for p in products]
+        'products': [p.to_dict(include_store=True, fieldset=fieldset) for p in products]
     }), 200
 
 
 @bp.route('/recent', methods=['GET'])
 def get_recent_products():
     """Get recently added products"""
-    limit = request.args.get('limit', 10, type=int)
+    fieldset = fieldsets.from_request()
+    pq = product_query.ProductQuery(sort='newest', limit=request.args.get('limit', 10, type=int))
     
-    products = Product.query.filter_by(
-        is_active=True
-    ).order_by(Product.created_at.desc()).limit(limit).all()
+    products = pq.build(fieldset, include_store=True).limit(pq.limit).all()
     
     return jsonify({
-        'products': [p.to_dict(include_store=True) for p in products]
+        'products': [p.to_dict(include_store=True, fieldset=fieldset) for p in products]
     }), 200
 
 
 @bp.route('/search', methods=['GET'])
 def search_products():
-    """Search products by title"""
-    query = request.args.get('q', '').strip()
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 20, type=int)
+    """Search products by title or category name, with the listing filters"""
+    fieldset = fieldsets.from_request()
+    pq = product_query.ProductQuery.from_request(request.args)
     
-    if not query:
+    if not pq.q:
         return jsonify({'products': [], 'pagination': {}}), 200
+    if pq.error:
+        return jsonify({'message': pq.error}), 400
     
-    products = Product.query.outerjoin(Product.categories).filter(
-        Product.is_active == True,
-        db.or_(
-            Product.title.ilike(f'%{query}%'),
-            Category.name.ilike(f'%{query}%')
-        )
-    ).distinct().order_by(Product.created_at.desc())
+    query = pq.build(fieldset, include_store=True)
     
-    pagination = products.paginate(page=page, per_page=limit, error_out=False)
+    # Paid search_boost listings matching the term go above the first page
+    boosted, products, pagination = placements.boosted_page(placements.search_boosts(pq.q), query, pq)
     
     return jsonify({
-        'products': [p.to_dict(include_store=True) for p in pagination.items],
-        'pagination': {
-            'page': page,
-            'limit': limit,
-            'total': pagination.total,
-            'pages': pagination.pages
-        }
+        'products': [dict(p.to_dict(include_store=True, fieldset=fieldset), is_boosted=True) for p in boosted] +
+                    [p.to_dict(include_store=True, fieldset=fieldset) for p in products],
+        'pagination': pagination
     }), 200
 
 
 @bp.route('/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     """Get single product detail"""
-    product = Product.query.get(product_id)
+    # Increment views in one statement; this also tells us whether the product exists.
+    # A view must not invalidate the product's ETag, so skip the version bump.
+    counted = db.session.execute(
+        db.update(Product)
+        .where(Product.id == product_id, Product.is_active == True)
+        .values(views=Product.views + 1)
+        .execution_options(synchronize_session=False, bump_versions=False)
+    ).rowcount
+    db.session.commit()
     
-    if not product or not product.is_active:
+    if not counted:
         return jsonify({'message': 'Product not found'}), 404
     
-    # Increment views
-    product.views += 1
-    db.session.commit()
-    
-    return jsonify({
-        'product': product.to_dict(include_store=True)
-    }), 200
+    # The embedded store and categories are covered by their table versions
+    stamp = (
+        etag.row_stamp('products', product_id),
+        etag.table_stamp('stores'),
+        etag.table_stamp('categories'),
+    )
+    cached = etag.not_modified(etag.make_etag(stamp))
+    if cached is not None:
+        return cached
+    
+    fieldset = fieldsets.from_request()
+    product = Product.query.options(*Product.load_options(fieldset, include_store=True)).get(product_id)
+    return etag.with_etag((jsonify({
+        'product': product.to_dict(include_store=True, fieldset=fieldset)
+    }), 200), stamp)
 
 
 @bp.route('', methods=['POST'])
@@ -151,9 +152,8 @@ def get_product(product_id):
 def create_product():
     """Create a new product (seller only)"""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
     
-    if not user or not user.is_seller:
+    if not tokens.claim('is_seller'):
         return jsonify({'message': 'You must be a seller to create products'}), 403
     
     store = Store.query.filter_by(owner_id=user_id).first()
@@ -297,7 +297,6 @@ def update_product(product_id):
 def delete_product(product_id):
     """Delete a product (owner only)"""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
     product = Product.query.get(product_id)
     
     if not product:
@@ -305,7 +304,7 @@ def delete_product(product_id):
     
     # Allow deletion if user is the owner OR is an admin
     is_owner = product.store.owner_id == user_id
-    is_admin = user and user.role in ['admin', 'super_admin']
+    is_admin = tokens.claim('role') in ['admin', 'super_admin']
     
     if not is_owner and not is_admin:
         return jsonify({'message': 'Unauthorized'}), 403
@@ -355,26 +354,9 @@ def get_product_reviews(product_id):
     
     pagination = reviews.paginate(page=page, per_page=limit, error_out=False)
     
-    # Calculate stats
-    all_reviews = Review.query.filter_by(
-        product_id=product_id,
-        is_approved=True,
-        is_hidden=False
-    ).all()
-    
-    total = len(all_reviews)
-    average = sum(r.rating for r in all_reviews) / total if total > 0 else 0
-    distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-    for r in all_reviews:
-        distribution[r.rating] = distribution.get(r.rating, 0) + 1
-    
     return jsonify({
         'reviews': [r.to_dict() for r in pagination.items],
-        'stats': {
-            'average': round(average, 1),
-            'total': total,
-            'distribution': distribution
-        },
+        'stats': ratings.get_stats(product_id),
         'pagination': {
             'page': page,
             'limit': limit,
@@ -404,7 +386,7 @@ def create_review(product_id):
     # Verify user has purchased this product (approved or completed orders)
     order = Order.query.filter(
         Order.buyer_id == user_id,
-        Order.product_id == product_id,
+        db.or_(Order.product_id == product_id, Order.items.any(OrderItem.product_id == product_id)),
         Order.status.in_([OrderStatus.APPROVED.value, OrderStatus.COMPLETED.value])
     ).first()
     
@@ -433,22 +415,8 @@ def create_review(product_id):
     
     db.session.add(review)
     
-    # Update product rating
-    product = Product.query.get(product_id)
-    if product:
-        total_rating = (product.rating * product.total_reviews) + rating
-        product.total_reviews += 1
-        product.rating = round(total_rating / product.total_reviews, 1)
-        
-        # Update store rating
-        store = product.store
-        if store:
-            # Recalculate store rating from all products
-            all_products = store.products.all()
-            if all_products:
-                avg_rating = sum(p.rating for p in all_products) / len(all_products)
-                store.rating = round(avg_rating, 1)
-                store.total_reviews += 1
+    # Update product and store rating counters
+    ratings.review_added(review)
     
     db.session.commit()
     
@@ -3,7 +3,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 
 from app import db, socketio
-from app.models import Review, Product, Order, OrderStatus, Notification, User, Store
+from app.models import Review, Product, Order, OrderItem, OrderStatus, Notification, User, Store
+from app.services import ratings
 
 bp = Blueprint('reviews', __name__)
 
@@ -89,10 +90,10 @@ def create_review():
         return jsonify({'message': 'Rating must be between 1 and 5'}), 400
     
     # Verify user has purchased this product
-    order = Order.query.filter_by(
-        buyer_id=user_id,
-        product_id=product_id,
-        status=OrderStatus.COMPLETED.value
+    order = Order.query.filter(
+        Order.buyer_id == user_id,
+        db.or_(Order.product_id == product_id, Order.items.any(OrderItem.product_id == product_id)),
+        Order.status == OrderStatus.COMPLETED.value
     ).first()
     
     if not order:
@@ -120,22 +121,9 @@ def create_review():
     
     db.session.add(review)
     
-    # Update product rating
+    # Update product and store rating counters
+    ratings.review_added(review)
     product = Product.query.get(product_id)
-    if product:
-        total_rating = (product.rating * product.total_reviews) + rating
-        product.total_reviews += 1
-        product.rating = round(total_rating / product.total_reviews, 1)
-        
-        # Update store rating
-        store = product.store
-        if store:
-            # Recalculate store rating from all products
-            all_products = store.products.all()
-            if all_products:
-                avg_rating = sum(p.rating for p in all_products) / len(all_products)
-                store.rating = round(avg_rating, 1)
-                store.total_reviews += 1
     
     db.session.flush()
     
@@ -182,15 +170,8 @@ def delete_review(review_id):
     if review.user_id != user_id:
         return jsonify({'message': 'Unauthorized'}), 403
     
-    # Update product rating before deletion
-    product = Product.query.get(review.product_id)
-    if product and product.total_reviews > 1:
-        total_rating = (product.rating * product.total_reviews) - review.rating
-        product.total_reviews -= 1
-        product.rating = round(total_rating / product.total_reviews, 1)
-    elif product:
-        product.rating = 0
-        product.total_reviews = 0
+    # Update product and store rating counters before deletion
+    ratings.review_removed(review)
     
     db.session.delete(review)
     db.session.commit()
@@ -1,15 +1,18 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import re
 import os
 from werkzeug.utils import secure_filename
 
 from app import db
-from app.models import Store, StoreRequest, User, Product, StoreRequestStatus
+from app.models import Store, StoreRequest, User, StoreRequestStatus
+from app.services import analytics, etag, fieldsets, product_query
 
 bp = Blueprint('stores', __name__)
 
+MAX_ANALYTICS_DAYS = 366
+
 
 def slugify(text):
     text = text.lower().strip()
@@ -25,8 +28,9 @@ def get_stores():
     limit = request.args.get('limit', 20, type=int)
     store_type = request.args.get('type')
     featured = request.args.get('featured', 'false').lower() == 'true'
+    fieldset = fieldsets.from_request()
     
-    query = Store.query.filter_by(is_active=True)
+    query = Store.query.options(*Store.load_options(fieldset)).filter_by(is_active=True)
     
     if store_type:
         query = query.filter_by(store_type=store_type)
@@ -37,7 +41,7 @@ def get_stores():
     pagination = query.paginate(page=page, per_page=limit, error_out=False)
     
     return jsonify({
-        'stores': [s.to_dict() for s in pagination.items],
+        'stores': [s.to_dict(fieldset=fieldset) for s in pagination.items],
         'pagination': {
             'page': page,
             'limit': limit,
@@ -51,17 +55,19 @@ def get_stores():
 def get_top_rated_stores():
     """Get top rated stores for home page"""
     limit = request.args.get('limit', 6, type=int)
+    fieldset = fieldsets.from_request()
     
-    stores = Store.query.filter_by(
+    stores = Store.query.options(*Store.load_options(fieldset)).filter_by(
         is_active=True
     ).order_by(Store.rating.desc(), Store.total_orders.desc()).limit(limit).all()
     
     return jsonify({
-        'stores': [s.to_dict() for s in stores]
+        'stores': [s.to_dict(fieldset=fieldset) for s in stores]
     }), 200
 
 
 @bp.route('/<int:store_id>', methods=['GET'])
+@etag.conditional(lambda store_id: etag.row_stamp('stores', store_id))
 def get_store(store_id):
     """Get single store detail"""
     store = Store.query.get(store_id)
@@ -69,7 +75,7 @@ def get_store(store_id):
     if not store or not store.is_active:
         return jsonify({'message': 'Store not found'}), 404
     
-    return jsonify({'store': store.to_dict()}), 200
+    return jsonify({'store': store.to_dict(fieldset=fieldsets.from_request())}), 200
 
 
 @bp.route('/slug/<slug>', methods=['GET'])
@@ -80,34 +86,27 @@ def get_store_by_slug(slug):
     if not store:
         return jsonify({'message': 'Store not found'}), 404
     
-    return jsonify({'store': store.to_dict()}), 200
+    return jsonify({'store': store.to_dict(fieldset=fieldsets.from_request())}), 200
 
 
 @bp.route('/<int:store_id>/products', methods=['GET'])
 def get_store_products(store_id):
     """Get products from a specific store"""
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 20, type=int)
+    fieldset = fieldsets.from_request()
     
     store = Store.query.get(store_id)
     if not store or not store.is_active:
         return jsonify({'message': 'Store not found'}), 404
     
-    products = Product.query.filter_by(
-        store_id=store_id, 
-        is_active=True
-    ).order_by(Product.created_at.desc())
+    pq = product_query.ProductQuery.from_request(request.args, store_id=store_id)
+    if pq.error:
+        return jsonify({'message': pq.error}), 400
     
-    pagination = products.paginate(page=page, per_page=limit, error_out=False)
+    products, pagination = pq.paginate(pq.build(fieldset))
     
     return jsonify({
-        'products': [p.to_dict() for p in pagination.items],
-        'pagination': {
-            'page': page,
-            'limit': limit,
-            'total': pagination.total,
-            'pages': pagination.pages
-        }
+        'products': [p.to_dict(fieldset=fieldset) for p in products],
+        'pagination': pagination
     }), 200
 
 
@@ -124,6 +123,30 @@ def get_my_store():
     return jsonify({'store': store.to_dict(include_bank=True)}), 200
 
 
+@bp.route('/my-store/analytics', methods=['GET'])
+@jwt_required()
+def get_my_store_analytics():
+    """Sales analytics for the current user's store over ?from=YYYY-MM-DD&to=YYYY-MM-DD"""
+    user_id = int(get_jwt_identity())
+    store = Store.query.filter_by(owner_id=user_id).first()
+    
+    if not store:
+        return jsonify({'message': 'You do not have a store yet'}), 404
+    
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow().date()
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({'message': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    if start > end or (end - start).days >= MAX_ANALYTICS_DAYS:
+        return jsonify({'message': f'Choose a range of at most {MAX_ANALYTICS_DAYS} days'}), 400
+    
+    report = analytics.store_report(store.id, start, end)
+    report['range'] = {'from': start.isoformat(), 'to': end.isoformat()}
+    return jsonify(report), 200
+
+
 @bp.route('/my-store', methods=['PUT'])
 @jwt_required()
 def update_my_store():
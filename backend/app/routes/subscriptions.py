@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 from app.models import db, User, Store, Subscription, FeaturedListing, AdRequest
+from app.services import placements, tokens
 
 subscriptions_bp = Blueprint('subscriptions', __name__)
 
@@ -174,10 +175,7 @@ def get_my_ad_requests():
 @jwt_required()
 def admin_get_featured():
     """Get all featured listings for admin"""
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    
-    if not user or user.role not in ['admin', 'super_admin']:
+    if tokens.claim('role') not in ['admin', 'super_admin']:
         return jsonify({'message': 'Unauthorized'}), 403
     
     listings = FeaturedListing.query.order_by(FeaturedListing.created_at.desc()).all()
@@ -192,19 +190,25 @@ def admin_get_featured():
 def admin_approve_featured(featured_id):
     """Approve a featured listing request"""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
     
-    if not user or user.role not in ['admin', 'super_admin']:
+    if tokens.claim('role') not in ['admin', 'super_admin']:
         return jsonify({'message': 'Unauthorized'}), 403
     
     featured = FeaturedListing.query.get(featured_id)
     if not featured:
         return jsonify({'message': 'Featured listing not found'}), 404
     
+    # The paid period starts on approval
+    now = datetime.utcnow()
     featured.status = 'approved'
-    featured.approved_at = datetime.utcnow()
+    featured.approved_at = now
     featured.approved_by = user_id
+    featured.starts_at = now
+    featured.expires_at = now + timedelta(days=FEATURED_PRICES.get(featured.listing_type, {}).get('duration_days', 7))
+    if featured.listing_type == 'home_featured' and featured.product:
+        featured.product.is_featured = True
     db.session.commit()
+    placements.invalidate()
     
     return jsonify({'message': 'Featured listing approved', 'featured': featured.to_dict()}), 200
 
@@ -213,10 +217,7 @@ def admin_approve_featured(featured_id):
 @jwt_required()
 def admin_reject_featured(featured_id):
     """Reject a featured listing request"""
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    
-    if not user or user.role not in ['admin', 'super_admin']:
+    if tokens.claim('role') not in ['admin', 'super_admin']:
         return jsonify({'message': 'Unauthorized'}), 403
     
     featured = FeaturedListing.query.get(featured_id)
@@ -227,6 +228,7 @@ def admin_reject_featured(featured_id):
     featured.status = 'rejected'
     featured.rejection_reason = data.get('reason', '')
     db.session.commit()
+    placements.invalidate()
     
     return jsonify({'message': 'Featured listing rejected'}), 200
 
@@ -235,10 +237,7 @@ def admin_reject_featured(featured_id):
 @jwt_required()
 def admin_approve_ad(ad_id):
     """Approve an ad request"""
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    
-    if not user or user.role not in ['admin', 'super_admin']:
+    if tokens.claim('role') not in ['admin', 'super_admin']:
         return jsonify({'message': 'Unauthorized'}), 403
     
     ad_request = AdRequest.query.get(ad_id)
@@ -250,6 +249,7 @@ def admin_approve_ad(ad_id):
     ad_request.starts_at = datetime.utcnow()
     ad_request.expires_at = datetime.utcnow() + timedelta(days=ad_request.duration_days)
     db.session.commit()
+    placements.invalidate()
     
     return jsonify({'message': 'Ad approved', 'ad': ad_request.to_dict()}), 200
 
@@ -258,10 +258,7 @@ def admin_approve_ad(ad_id):
 @jwt_required()
 def admin_reject_ad(ad_id):
     """Reject an ad request"""
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    
-    if not user or user.role not in ['admin', 'super_admin']:
+    if tokens.claim('role') not in ['admin', 'super_admin']:
         return jsonify({'message': 'Unauthorized'}), 403
     
     ad_request = AdRequest.query.get(ad_id)
@@ -272,5 +269,6 @@ def admin_reject_ad(ad_id):
     ad_request.status = 'rejected'
     ad_request.rejection_reason = data.get('reason', '')
     db.session.commit()
+    placements.invalidate()
     
     return jsonify({'message': 'Ad rejected'}), 200
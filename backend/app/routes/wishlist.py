@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app import db
 from app.models import Wishlist, Product
+from app.services import fieldsets
 
 bp = Blueprint('wishlist', __name__)
 
@@ -14,20 +15,22 @@ def get_wishlist():
     user_id = int(get_jwt_identity())
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
+    fieldset = fieldsets.from_request()
 
-    items = Wishlist.query.filter_by(user_id=user_id)\
-        .order_by(Wishlist.created_at.desc())
+    items = Wishlist.query.options(
+        db.joinedload(Wishlist.product).options(*Product.load_options(fieldset, include_store=True))
+    ).filter_by(user_id=user_id).order_by(Wishlist.created_at.desc())
     pagination = items.paginate(page=page, per_page=limit, error_out=False)
 
     results = []
     for item in pagination.items:
-        product = Product.query.get(item.product_id)
+        product = item.product
         if product and product.is_active:
             results.append({
                 'id': item.id,
                 'product_id': item.product_id,
                 'created_at': item.created_at.isoformat() if item.created_at else None,
-                'product': product.to_dict(include_store=True),
+                'product': product.to_dict(include_store=True, fieldset=fieldset),
             })
 
     return jsonify({
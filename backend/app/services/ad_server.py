@@ -0,0 +1,138 @@
+"""
+Ad rotation for banner slots.
+
+Each position gets a "wheel" built from the live placements snapshot: a list
+in which every ad appears `weight` times, spread out with smooth weighted
+round-robin, so paid placements get PAID_WEIGHT turns for each turn of a
+house banner. A per-position cursor advances on every call, so consecutive
+calls start at different ads.
+
+Every viewer (a user id or a client address) is capped at
+AD_FREQUENCY_CAP impressions per ad per AD_FREQUENCY_WINDOW_MINUTES. The
+counts live in a bounded in-process LRU. Impressions are also counted in
+memory and written to the database by flush_impressions(), which runs from
+the scheduler. A call to serve() therefore touches no database at all
+unless the snapshot itself is due for a rebuild.
+"""
+import itertools
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+from flask import current_app
+from sqlalchemy import case, update
+
+from app import db
+from app.models import AdRequest, AdsBanner
+from app.services import placements
+
+
+HOUSE_WEIGHT = 1
+PAID_WEIGHT = 3
+
+VIEWER_CACHE_SIZE = 50000
+
+_MODELS = {'banner': AdsBanner, 'request': AdRequest}
+
+_index_for = None
+_wheels = {}
+_cursors = defaultdict(itertools.count)
+_views = OrderedDict()
+_impressions = Counter()
+
+
+def _key(ad):
+    return (ad['source'], ad['id'])
+
+
+def _wheel(ads):
+    """Interleave ads by weight with smooth weighted round-robin."""
+    weights = [PAID_WEIGHT if ad['source'] == 'request' else HOUSE_WEIGHT for ad in ads]
+    total = sum(weights)
+    current = [0] * len(ads)
+    wheel = []
+    for _ in range(total):
+        for i, weight in enumerate(weights):
+            current[i] += weight
+        best = max(range(len(ads)), key=current.__getitem__)
+        current[best] -= total
+        wheel.append(ads[best])
+    return tuple(wheel)
+
+
+def _index():
+    """Per-position wheels for the current snapshot, rebuilt when the snapshot changes."""
+    global _index_for, _wheels
+    snapshot = placements.get()
+    if snapshot is not _index_for:
+        _wheels = {position: _wheel(ads) for position, ads in snapshot.ads.items()}
+        _index_for = snapshot
+    return _wheels
+
+
+def _viewer_counts(viewer):
+    window = current_app.config.get('AD_FREQUENCY_WINDOW_MINUTES', 60) * 60
+    key = (viewer, int(time.time() // window))
+    counts = _views.get(key)
+    if counts is None:
+        counts = _views[key] = Counter()
+        while len(_views) > VIEWER_CACHE_SIZE:
+            _views.popitem(last=False)
+    else:
+        _views.move_to_end(key)
+    return counts
+
+
+def serve(position=None, slots=1, viewer=None):
+    """Pick up to `slots` distinct ads for a position and record the impressions."""
+    wheel = _index().get(position)
+    if not wheel:
+        return []
+
+    cap = current_app.config.get('AD_FREQUENCY_CAP', 5)
+    counts = _viewer_counts(viewer) if viewer is not None else Counter()
+    start = next(_cursors[position])
+    picked, capped, keys = [], [], set()
+    for offset in range(len(wheel)):
+        ad = wheel[(start + offset) % len(wheel)]
+        key = _key(ad)
+        if key in keys:
+            continue
+        keys.add(key)
+        if counts[key] >= cap:
+            capped.append(ad)
+            continue
+        picked.append(ad)
+        if len(picked) == slots:
+            break
+
+    # Rather than an empty slot, fall back to ads the viewer has already seen
+    if not picked:
+        picked = capped[:slots]
+
+    for ad in picked:
+        key = _key(ad)
+        counts[key] += 1
+        _impressions[key] += 1
+    return picked
+
+
+def flush_impressions():
+    """Add the impressions counted since the last flush to the ads' counters. Returns ads updated."""
+    global _impressions
+    pending, _impressions = _impressions, Counter()
+    try:
+        for source, model in _MODELS.items():
+            counts = {ad_id: n for (kind, ad_id), n in pending.items() if kind == source}
+            if not counts:
+                continue
+            db.session.execute(
+                update(model)
+                .where(model.id.in_(list(counts)))
+                .values(impressions=db.func.coalesce(model.impressions, 0) + case(counts, value=model.id, else_=0))
+                .execution_options(synchronize_session=False, bump_versions=False)
+            )
+        db.session.commit()
+    except Exception:
+        _impressions.update(pending)
+        raise
+    return len(pending)
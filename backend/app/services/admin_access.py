@@ -0,0 +1,72 @@
+"""
+Cached admin access records.
+
+access(user_id) returns the user's role, active flag and support-admin
+permissions. User.to_dict() calls it for every support admin it
+serializes. Records are cached per user id
+for PERMISSION_CACHE_SECONDS. The admin routes that change a role, an
+active flag or a support admin's permissions call invalidate() after they
+commit. The TTL bounds staleness for any other writer.
+
+load(user_ids) fills the cache for a whole list with one query, so admin
+lists do not look up permissions row by row.
+"""
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import AdminRole, User
+from app.services.cache import TTLCache
+
+
+_cache = TTLCache(ttl=60, maxsize=4096)
+
+
+def _configure():
+    _cache.ttl = current_app.config.get('PERMISSION_CACHE_SECONDS', 60)
+
+
+def _record(row):
+    return {'role': row.role, 'is_active': row.is_active, 'permissions': list(row.permissions or [])}
+
+
+def load(user_ids):
+    """Access records for many users, keyed by id. Cache misses are read with one IN query."""
+    _configure()
+    records = {}
+    missing = []
+    for user_id in set(user_ids):
+        record = _cache.get(user_id)
+        if record is None:
+            missing.append(user_id)
+        else:
+            records[user_id] = record
+    if missing:
+        rows = db.session.execute(
+            select(User.id, User.role, User.is_active, AdminRole.permissions)
+            .outerjoin(AdminRole, AdminRole.user_id == User.id)
+            .where(User.id.in_(missing))
+        )
+        for row in rows:
+            records[row.id] = _record(row)
+            _cache.set(row.id, records[row.id])
+    return records
+
+
+def access(user_id):
+    """Access record for one user, or None if the user does not exist."""
+    return load([user_id]).get(user_id)
+
+
+def permissions(user_id):
+    """Support-admin permissions of a user ([] if none)."""
+    record = access(user_id)
+    return record['permissions'] if record else []
+
+
+def invalidate(user_id=None):
+    """Forget one user's record, or every record when called without an id."""
+    if user_id is None:
+        _cache.invalidate()
+    else:
+        _cache.invalidate(user_id)
@@ -0,0 +1,208 @@
+"""
+Daily sales rollups for seller analytics.
+
+store_daily_sales and product_daily_sales count the orders (and units and
+revenue) that entered each status on each day: placed (pending_payment),
+awaiting_approval, approved, completed, rejected and cancelled. record() is
+called wherever an order changes state (order creation, cart checkout and
+order_states.apply). It adds to the rows with one upsert per table in the
+caller's transaction, so analytics reads never touch the orders table.
+
+reconcile() recomputes a range of days from the orders' own timestamps. The
+scheduler runs it nightly over the last few days to correct any drift, and
+`flask rebuild-sales-rollups` runs it over the whole history. Rejections and
+cancellations have no timestamp of their own, so their day is the order's
+updated_at.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, func, select
+
+from app import db
+from app.models import Order, OrderItem, OrderStatus, Product, ProductDailySales, StoreDailySales
+from app.services import dialect
+
+
+# Column holding the time an order entered each status
+STATUS_TIMES = {
+    OrderStatus.PENDING_PAYMENT.value: Order.created_at,
+    OrderStatus.AWAITING_APPROVAL.value: Order.payment_confirmed_at,
+    OrderStatus.APPROVED.value: Order.approved_at,
+    OrderStatus.COMPLETED.value: Order.completed_at,
+    OrderStatus.REJECTED.value: Order.updated_at,
+    OrderStatus.CANCELLED.value: Order.updated_at,
+}
+
+RECONCILE_DAYS = 3
+
+_COUNTERS = ('orders', 'units', 'revenue')
+
+
+def _lines(order):
+    """(product_id, quantity, revenue) for every line of an order."""
+    if order.items:
+        return [(item.product_id, item.quantity, item.total_price) for item in order.items]
+    return [(order.product_id, order.quantity, order.total_price)]
+
+
+def _upsert(model, keys, rows, increment):
+    if not rows:
+        return
+    stmt = dialect.insert()(model).values(rows)
+    if increment:
+        set_ = {name: getattr(model, name) + stmt.excluded[name] for name in _COUNTERS}
+    else:
+        set_ = {name: stmt.excluded[name] for name in _COUNTERS}
+    db.session.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_))
+
+
+def _write(store_totals, product_totals, increment=True):
+    _upsert(StoreDailySales, ['store_id', 'day', 'status'], [
+        dict(store_id=store_id, day=day, status=status, **totals)
+        for (store_id, day, status), totals in store_totals.items()
+    ], increment)
+    _upsert(ProductDailySales, ['product_id', 'day', 'status'], [
+        dict(product_id=product_id, day=day, status=status, **totals)
+        for (product_id, day, status), totals in product_totals.items()
+    ], increment)
+
+
+def _new_totals():
+    return {'orders': 0, 'units': 0, 'revenue': Decimal('0')}
+
+
+def record(orders, status, now=None):
+    """Count orders entering `status` now. Runs in the caller's transaction."""
+    day = (now or datetime.utcnow()).date()
+    store_totals = defaultdict(_new_totals)
+    product_totals = defaultdict(_new_totals)
+    for order in orders:
+        store_row = store_totals[(order.store_id, day, status)]
+        store_row['orders'] += 1
+        for product_id, quantity, revenue in _lines(order):
+            store_row['units'] += quantity
+            store_row['revenue'] += Decimal(str(revenue or 0))
+            product_row = product_totals[(product_id, day, status)]
+            product_row['store_id'] = order.store_id
+            product_row['orders'] += 1
+            product_row['units'] += quantity
+            product_row['revenue'] += Decimal(str(revenue or 0))
+    _write(store_totals, product_totals)
+
+
+def _day(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def reconcile(start, end=None):
+    """Rebuild the rollup rows for days in [start, end) from the orders table. The caller commits."""
+    end = end or datetime.utcnow().date() + timedelta(days=1)
+    lower, upper = datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+
+    db.session.execute(delete(StoreDailySales).where(StoreDailySales.day >= start, StoreDailySales.day < end))
+    db.session.execute(delete(ProductDailySales).where(ProductDailySales.day >= start, ProductDailySales.day < end))
+
+    store_totals = defaultdict(_new_totals)
+    product_totals = defaultdict(_new_totals)
+    line_product = func.coalesce(OrderItem.product_id, Order.product_id)
+    line_quantity = func.coalesce(OrderItem.quantity, Order.quantity)
+    line_revenue = func.coalesce(OrderItem.total_price, Order.total_price)
+
+    for status, column in STATUS_TIMES.items():
+        # Orders that entered this status in range; rejected/cancelled ones must still be in it
+        where = [column >= lower, column < upper]
+        if column is Order.updated_at:
+            where.append(Order.status == status)
+        day = func.date(column)
+
+        for store_id, order_day, orders, units, revenue in db.session.execute(
+            select(Order.store_id, day, func.count(func.distinct(Order.id)), func.sum(line_quantity), func.sum(line_revenue))
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .where(*where)
+            .group_by(Order.store_id, day)
+        ):
+            store_totals[(store_id, _day(order_day), status)].update(orders=orders, units=units, revenue=revenue)
+
+        for product_id, store_id, order_day, orders, units, revenue in db.session.execute(
+            select(line_product, Order.store_id, day, func.count(), func.sum(line_quantity), func.sum(line_revenue))
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .where(*where)
+            .group_by(line_product, Order.store_id, day)
+        ):
+            product_totals[(product_id, _day(order_day), status)].update(
+                store_id=store_id, orders=orders, units=units, revenue=revenue
+            )
+
+    _write(store_totals, product_totals, increment=False)
+    return len(store_totals)
+
+
+def reconcile_recent():
+    """Nightly drift correction over the last RECONCILE_DAYS days."""
+    reconcile(datetime.utcnow().date() - timedelta(days=RECONCILE_DAYS))
+    db.session.commit()
+
+
+def rebuild():
+    """Recompute the rollups from the first order on. Returns the number of store/day/status rows."""
+    first = db.session.scalar(select(func.min(Order.created_at)))
+    if first is None:
+        return 0
+    count = reconcile(first.date())
+    db.session.commit()
+    return count
+
+
+def store_report(store_id, start, end):
+    """Totals per status, a daily series and top products for a store over [start, end]."""
+    rows = StoreDailySales.query.filter(
+        StoreDailySales.store_id == store_id,
+        StoreDailySales.day >= start,
+        StoreDailySales.day <= end,
+    ).all()
+
+    totals = {status: {'orders': 0, 'units': 0, 'revenue': 0.0} for status in STATUS_TIMES}
+    daily = {}
+    for row in rows:
+        total = totals[row.status]
+        total['orders'] += row.orders
+        total['units'] += row.units
+        total['revenue'] += float(row.revenue)
+        bucket = daily.setdefault(row.day, {status: 0 for status in STATUS_TIMES})
+        bucket[row.status] = row.orders
+        if row.status == OrderStatus.APPROVED.value:
+            bucket['revenue'] = float(row.revenue)
+            bucket['units'] = row.units
+
+    series = []
+    day = start
+    while day <= end:
+        entry = daily.get(day) or {status: 0 for status in STATUS_TIMES}
+        series.append(dict({'revenue': 0.0, 'units': 0}, **entry, day=day.isoformat()))
+        day += timedelta(days=1)
+
+    sold = ProductDailySales.status == OrderStatus.APPROVED.value
+    top = db.session.execute(
+        select(
+            ProductDailySales.product_id,
+            Product.title,
+            func.sum(ProductDailySales.units).label('units'),
+            func.sum(ProductDailySales.revenue).label('revenue'),
+        )
+        .join(Product, Product.id == ProductDailySales.product_id)
+        .where(ProductDailySales.store_id == store_id, ProductDailySales.day >= start, ProductDailySales.day <= end, sold)
+        .group_by(ProductDailySales.product_id, Product.title)
+        .order_by(func.sum(ProductDailySales.revenue).desc())
+        .limit(10)
+    ).all()
+
+    return {
+        'totals': totals,
+        'daily': series,
+        'top_products': [
+            {'product_id': r.product_id, 'title': r.title, 'units': int(r.units or 0), 'revenue': float(r.revenue or 0)}
+            for r in top
+        ],
+    }
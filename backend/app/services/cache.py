@@ -0,0 +1,52 @@
+"""
+Small in-process TTL cache for expensive read-mostly results.
+
+Entries expire `ttl` seconds after they were stored. Like the ETag registry
+this lives in process memory, which matches the single-worker deployment;
+with more workers each one simply keeps its own copy.
+"""
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires <= time.monotonic():
+            self._data.pop(key, None)
+            return default
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_set(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=_MISSING):
+        """Drop one key, or everything when called without a key."""
+        if key is _MISSING:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
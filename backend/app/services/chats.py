@@ -0,0 +1,76 @@
+"""
+Buyer-seller chat lookup.
+
+Every chat carries a canonical (user_min_id, user_max_id) pair key with a
+unique index, so finding the chat between two users is a single indexed
+probe and concurrent requests cannot create duplicates. Resolved pairs are
+kept in a bounded in-process LRU (pair -> chat id). A cached pair is loaded
+by primary key, which needs no query at all when the chat is already in the
+session.
+"""
+from collections import OrderedDict
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Chat
+
+
+CACHE_SIZE = 10000
+
+_chat_ids = OrderedDict()
+
+
+def pair_key(user_a, user_b):
+    """Canonical (min, max) key for a pair of users."""
+    user_a, user_b = int(user_a), int(user_b)
+    return (user_a, user_b) if user_a < user_b else (user_b, user_a)
+
+
+def _remember(key, chat_id):
+    _chat_ids[key] = chat_id
+    _chat_ids.move_to_end(key)
+    while len(_chat_ids) > CACHE_SIZE:
+        _chat_ids.popitem(last=False)
+
+
+def find(user_a, user_b):
+    """Existing chat between two users, or None."""
+    key = pair_key(user_a, user_b)
+    chat_id = _chat_ids.get(key)
+    if chat_id is not None:
+        chat = db.session.get(Chat, chat_id)
+        if chat is not None:
+            _chat_ids.move_to_end(key)
+            return chat
+        _chat_ids.pop(key, None)
+
+    chat = Chat.query.filter_by(user_min_id=key[0], user_max_id=key[1]).first()
+    if chat is not None:
+        _remember(key, chat.id)
+    return chat
+
+
+def get_or_create(user_id, other_user_id, product_id=None):
+    """
+    Chat between two users, created (with user_id as user1) if missing.
+    Returns (chat, created). The new chat is flushed, not committed.
+    """
+    chat = find(user_id, other_user_id)
+    if chat is not None:
+        return chat, False
+
+    low, high = pair_key(user_id, other_user_id)
+    chat = Chat(user1_id=user_id, user2_id=other_user_id, user_min_id=low, user_max_id=high,
+                product_id=product_id)
+    try:
+        with db.session.begin_nested():
+            db.session.add(chat)
+    except IntegrityError:
+        # Another request created the chat first
+        chat = Chat.query.filter_by(user_min_id=low, user_max_id=high).one()
+        _remember((low, high), chat.id)
+        return chat, False
+
+    _remember((low, high), chat.id)
+    return chat, True
@@ -0,0 +1,55 @@
+"""
+Response compression (brotli or gzip) for JSON/text responses above a size threshold.
+Brotli is used when the client accepts it and the package is installed.
+"""
+import gzip
+
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/csv', 'application/x-ndjson'}
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(response):
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or response.is_streamed or response.direct_passthrough
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+
+    encoding = _choose_encoding()
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=current_app.config.get('COMPRESS_BROTLI_QUALITY', 4))
+    elif encoding == 'gzip':
+        compressed = gzip.compress(data, compresslevel=current_app.config.get('COMPRESS_GZIP_LEVEL', 6))
+    else:
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    """Register the compression hook. Register before etag so it runs after it."""
+    app.after_request(_compress)
@@ -0,0 +1,147 @@
+"""
+Admin dashboard numbers.
+
+The headline counts come from one statement: each table is aggregated once
+(with FILTER clauses where one table feeds several counts), and the
+single-row results are cross joined. The response is cached for
+DASHBOARD_CACHE_SECONDS, because the page auto-refreshes.
+
+The charts read daily_platform_stats, one row per day. The scheduler
+recomputes the last few days, while their orders can still be approved,
+from range scans on the indexed created_at columns. `flask
+rebuild-daily-stats` backfills history. The charts never scan the orders
+table.
+"""
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select, true
+
+from app import db
+from app.models import (
+    DailyPlatformStats, Order, OrderStatus, Product, Report, Store, StoreRequest, StoreRequestStatus, User
+)
+from app.services import dialect
+from app.services.cache import TTLCache
+
+
+MAX_SERIES_DAYS = 365
+
+SOLD = (OrderStatus.APPROVED.value, OrderStatus.COMPLETED.value)
+
+_cache = TTLCache(ttl=30, maxsize=32)
+
+
+def _counts():
+    count = func.count()
+    users = select(
+        count.filter(User.is_active == True).label('total_users'),
+        count.filter(User.is_seller == True).label('total_sellers'),
+    ).subquery()
+    stores = select(count.filter(Store.is_active == True).label('total_stores')).subquery()
+    products = select(count.filter(Product.is_active == True).label('total_products')).subquery()
+    orders = select(count.label('total_orders')).select_from(Order).subquery()
+    requests = select(
+        count.filter(StoreRequest.status == StoreRequestStatus.PENDING.value).label('pending_requests')
+    ).subquery()
+    reports = select(count.filter(Report.status == 'pending').label('pending_reports')).subquery()
+
+    # Each subquery yields exactly one row, so joining them ON TRUE gives one row
+    parts = [users, stores, products, orders, requests, reports]
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined.join(part, true())
+    row = db.session.execute(select(*parts).select_from(joined)).mappings().one()
+    return dict(row)
+
+
+def _day(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def series(days):
+    """Daily orders, GMV and signups for the last `days` days, oldest first, with empty days filled."""
+    start = datetime.utcnow().date() - timedelta(days=days - 1)
+    rows = {
+        row.day: row.to_dict()
+        for row in DailyPlatformStats.query.filter(DailyPlatformStats.day >= start)
+    }
+    return [
+        rows.get(day) or {'day': day.isoformat(), 'orders': 0, 'gmv': 0.0, 'signups': 0}
+        for day in (start + timedelta(days=i) for i in range(days))
+    ]
+
+
+def snapshot(days=30):
+    """Counts and chart series, cached for DASHBOARD_CACHE_SECONDS."""
+    days = min(max(days, 1), MAX_SERIES_DAYS)
+    _cache.ttl = current_app.config.get('DASHBOARD_CACHE_SECONDS', 30)
+    return _cache.get_or_set(days, lambda: {'stats': _counts(), 'series': series(days)})
+
+
+def rollup(start, end=None):
+    """Recompute daily_platform_stats for the days in [start, end). The caller commits. Returns days written."""
+    end = end or datetime.utcnow().date() + timedelta(days=1)
+    lower, upper = datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+    totals = {}
+
+    order_day = func.date(Order.created_at)
+    for day, orders, gmv in db.session.execute(
+        select(order_day, func.count(), func.coalesce(func.sum(Order.total_price).filter(Order.status.in_(SOLD)), 0))
+        .where(Order.created_at >= lower, Order.created_at < upper)
+        .group_by(order_day)
+    ):
+        totals.setdefault(_day(day), {}).update(orders=orders, gmv=gmv)
+
+    user_day = func.date(User.created_at)
+    for day, signups in db.session.execute(
+        select(user_day, func.count())
+        .where(User.created_at >= lower, User.created_at < upper)
+        .group_by(user_day)
+    ):
+        totals.setdefault(_day(day), {})['signups'] = signups
+
+    now = datetime.utcnow()
+    rows = []
+    day = start
+    while day < end:
+        values = totals.get(day, {})
+        rows.append({
+            'day': day,
+            'orders': values.get('orders', 0),
+            'gmv': values.get('gmv', 0),
+            'signups': values.get('signups', 0),
+            'updated_at': now,
+        })
+        day += timedelta(days=1)
+    if not rows:
+        return 0
+
+    stmt = dialect.insert()(DailyPlatformStats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day'],
+        set_={name: stmt.excluded[name] for name in ('orders', 'gmv', 'signups', 'updated_at')},
+    )
+    db.session.execute(stmt)
+    return len(rows)
+
+
+def rollup_recent():
+    """Refresh the days whose orders can still change state (the payment and approval windows)."""
+    hours = current_app.config.get('ORDER_PAYMENT_TIMEOUT_HOURS', 24) + current_app.config.get('ORDER_APPROVAL_TIMEOUT_HOURS', 72)
+    rollup(datetime.utcnow().date() - timedelta(days=hours // 24 + 1))
+    db.session.commit()
+
+
+def rebuild():
+    """Recompute every day since the first order or signup. Returns days written."""
+    first = db.session.execute(select(
+        select(func.min(Order.created_at)).scalar_subquery(),
+        select(func.min(User.created_at)).scalar_subquery(),
+    )).one()
+    starts = [value for value in first if value is not None]
+    if not starts:
+        return 0
+    written = rollup(min(starts).date())
+    db.session.commit()
+    return written
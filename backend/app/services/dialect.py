@@ -0,0 +1,13 @@
+"""
+Dialect-specific SQL constructs (PostgreSQL in production, SQLite in tests).
+"""
+from app import db
+
+
+def insert():
+    """The dialect's insert() construct, which supports ON CONFLICT upserts."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
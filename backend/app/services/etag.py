@@ -0,0 +1,181 @@
+"""
+ETag / conditional-GET support for JSON API responses.
+
+Two strategies are used:
+- Version stamps: every ORM write bumps an in-process version counter for the
+  row (and its table) once its transaction commits. Views decorated with
+  ``conditional`` build their ETag from those counters *before* running, so a
+  matching ``If-None-Match`` is answered with 304 without touching the
+  database or serializing anything. Bumping at commit rather than at flush
+  means no request can read the old row under the new stamp.
+- Body hash: any other successful JSON GET gets a weak ETag computed from the
+  response body, which still saves the transfer on unchanged payloads.
+
+The version registry lives in process memory. That matches how the API is
+deployed (one eventlet worker, see Procfile); a per-boot token is mixed into
+every stamp so ETags issued before a restart never validate afterwards.
+"""
+import hashlib
+import itertools
+import uuid
+from functools import wraps
+
+from flask import request, make_response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+
+_BOOT_TOKEN = uuid.uuid4().hex[:8]
+_counter = itertools.count(1)
+_versions = {}
+
+# Marker for versions bumped by bulk UPDATE/DELETE statements, where the
+# affected row ids are unknown and every row of the table must be invalidated.
+_ALL_ROWS = '*'
+
+# Child tables whose rows are embedded in a parent's payload:
+# table -> [(parent table, foreign key attribute)]
+_PARENTS = {
+    'product_media': [('products', 'product_id')],
+    'products': [('stores', 'store_id')],  # Store.to_dict reports total_products
+}
+
+
+def bump(table, row_id=None):
+    """Mark a row (or a whole table when row_id is None) as changed (takes effect on commit)."""
+    _pending(db.session).add((table, row_id))
+
+
+def _pending(session):
+    return session.info.setdefault('etag_rows', set())
+
+
+def _bump_now(table, row_id=None):
+    value = next(_counter)
+    if row_id is not None:
+        _versions[(table, row_id)] = value
+    _versions[(table, None)] = value
+
+
+def row_stamp(table, row_id):
+    """Version stamp for a single row."""
+    return (table, row_id, _versions.get((table, row_id), 0), _versions.get((table, _ALL_ROWS), 0))
+
+
+def table_stamp(table):
+    """Version stamp covering every row of a table."""
+    return (table, _versions.get((table, None), 0))
+
+
+def make_etag(stamp):
+    """Build an ETag from a version stamp and the request URL (query args included)."""
+    raw = f'{_BOOT_TOKEN}|{request.full_path}|{stamp!r}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds this ETag, else None."""
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        _set_etag(response, etag)
+        return response
+    return None
+
+
+def _set_etag(response, etag):
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    if request.headers.get('Authorization'):
+        response.cache_control.private = True
+
+
+def conditional(stamp_fn):
+    """
+    Decorator for GET views whose payload is fully described by a version stamp.
+    stamp_fn receives the view's URL kwargs and must not query the database.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            etag = make_etag(stamp_fn(**kwargs))
+            cached = not_modified(etag)
+            if cached is not None:
+                return cached
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_etag(response, etag)
+            return response
+        return wrapped
+    return decorator
+
+
+def with_etag(rv, stamp):
+    """Attach a version-stamp ETag to a view's return value."""
+    response = make_response(rv)
+    if response.status_code == 200:
+        _set_etag(response, make_etag(stamp))
+    return response
+
+
+def _hash_etag(response):
+    """Fallback: weak ETag from the body hash for other JSON GET responses."""
+    if (request.method != 'GET' or response.status_code != 200
+            or response.is_streamed or response.direct_passthrough
+            or response.mimetype != 'application/json' or 'ETag' in response.headers):
+        return response
+
+    response.add_etag(weak=True)
+    response.cache_control.no_cache = True
+    if request.headers.get('Authorization'):
+        response.cache_control.private = True
+    return response.make_conditional(request)
+
+
+def _bump_flushed(session, flush_context):
+    pending = _pending(session)
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if not table:
+            continue
+        pending.add((table, getattr(obj, 'id', None)))
+        for parent_table, fk in _PARENTS.get(table, []):
+            parent_id = getattr(obj, fk, None)
+            if parent_id is not None:
+                pending.add((parent_table, parent_id))
+
+
+def _bump_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get('bump_versions', True) is False:
+        return
+    table = getattr(orm_execute_state.statement.table, 'name', None)
+    if table:
+        _pending(orm_execute_state.session).add((table, _ALL_ROWS))
+
+
+def _after_commit(session):
+    for table, row_id in session.info.pop('etag_rows', ()):
+        if row_id == _ALL_ROWS:
+            _bump_now(table)
+            _versions[(table, _ALL_ROWS)] = _versions[(table, None)]
+        else:
+            _bump_now(table, row_id)
+
+
+def _after_rollback(session, previous_transaction):
+    if previous_transaction.nested:
+        return
+    session.info.pop('etag_rows', None)
+
+
+def init_app(app):
+    """Register the write listeners and the body-hash fallback."""
+    if not event.contains(Session, 'after_flush', _bump_flushed):
+        event.listen(Session, 'after_flush', _bump_flushed)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_soft_rollback', _after_rollback)
+        event.listen(Session, 'do_orm_execute', _bump_bulk)
+    app.after_request(_hash_etag)
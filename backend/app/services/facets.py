@@ -0,0 +1,206 @@
+"""
+Facet counts for category pages.
+
+For every category that has been browsed, an in-process index keeps one
+facet row per active product: product type, price bucket, store, rating
+band and stock status. It also keeps a Counter per facet, so reading the
+counts costs no query at all.
+
+The index is refreshed incrementally. Product writes are noticed in
+after_flush. Once the transaction commits, their ids become pending. The
+next read re-reads only those products, in one query, and moves their rows
+between counters. Bulk UPDATEs on products follow the same contract as the
+ETag registry:
+- Statements that opt out with bump_versions=False call touch() for the
+  rows they change.
+- Any other bulk statement resets the whole index when it commits.
+"""
+from collections import Counter, defaultdict
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Product, Store, product_categories
+
+
+# Upper bounds of the price buckets, in naira; the last bucket is open-ended
+PRICE_BUCKETS = (1000, 5000, 10000, 50000)
+RATING_BANDS = (4, 3, 2, 1)
+MAX_STORES = 20
+
+FACETS = ('product_type', 'price', 'store', 'rating', 'in_stock')
+
+_indexes = {}  # category id -> _CategoryFacets
+_memberships = defaultdict(set)  # product id -> ids of indexed categories it belongs to
+_store_names = {}
+_pending_products = set()
+_pending_stores = set()
+
+
+def _price_bucket(price):
+    price = float(price or 0)
+    for i, upper in enumerate(PRICE_BUCKETS):
+        if price < upper:
+            return i
+    return len(PRICE_BUCKETS)
+
+
+def _facet_key(row):
+    return (
+        row.product_type,
+        _price_bucket(row.price),
+        row.store_id,
+        int(row.rating or 0),
+        bool(row.is_in_stock and (row.stock_quantity or 0) > 0),
+    )
+
+
+class _CategoryFacets:
+    """Facet rows and counters for one category."""
+
+    def __init__(self):
+        self.rows = {}
+        self.counts = {name: Counter() for name in FACETS}
+
+    def add(self, product_id, key):
+        self.remove(product_id)
+        self.rows[product_id] = key
+        for name, value in zip(FACETS, key):
+            self.counts[name][value] += 1
+
+    def remove(self, product_id):
+        key = self.rows.pop(product_id, None)
+        if key is not None:
+            for name, value in zip(FACETS, key):
+                self.counts[name][value] -= 1
+                if not self.counts[name][value]:
+                    del self.counts[name][value]
+
+
+def _product_rows(*where):
+    return db.session.execute(
+        select(
+            Product.id, Product.product_type, Product.price, Product.store_id, Product.rating,
+            Product.is_in_stock, Product.stock_quantity, Store.name.label('store_name'),
+            product_categories.c.category_id,
+        )
+        .join(product_categories, product_categories.c.product_id == Product.id)
+        .join(Store, Store.id == Product.store_id)
+        .where(Product.is_active == True, *where)
+    ).all()
+
+
+def _load(category_id):
+    index = _CategoryFacets()
+    for row in _product_rows(product_categories.c.category_id == category_id):
+        index.add(row.id, _facet_key(row))
+        _memberships[row.id].add(category_id)
+        _store_names[row.store_id] = row.store_name
+    _indexes[category_id] = index
+    return index
+
+
+def _refresh():
+    """Re-read pending products and stores and move their rows."""
+    if _pending_stores:
+        stores = list(_pending_stores)
+        _pending_stores.clear()
+        _store_names.update(db.session.execute(select(Store.id, Store.name).where(Store.id.in_(stores))).all())
+
+    if not _pending_products or not _indexes:
+        _pending_products.clear()
+        return
+    product_ids = list(_pending_products)
+    _pending_products.clear()
+
+    current = defaultdict(dict)  # product id -> {category id: facet key}
+    for row in _product_rows(Product.id.in_(product_ids), product_categories.c.category_id.in_(list(_indexes))):
+        current[row.id][row.category_id] = _facet_key(row)
+        _store_names[row.store_id] = row.store_name
+
+    for product_id in product_ids:
+        rows = current.get(product_id, {})
+        for category_id in _memberships.pop(product_id, set()) - set(rows):
+            _indexes[category_id].remove(product_id)
+        for category_id, key in rows.items():
+            _indexes[category_id].add(product_id, key)
+        if rows:
+            _memberships[product_id] = set(rows)
+
+
+def _price_label(i):
+    lower = PRICE_BUCKETS[i - 1] if i else 0
+    upper = PRICE_BUCKETS[i] if i < len(PRICE_BUCKETS) else None
+    return {'min': lower, 'max': upper}
+
+
+def counts(category_id):
+    """Facet counts for the active products of a category."""
+    _refresh()
+    index = _indexes.get(category_id) or _load(category_id)
+    c = index.counts
+    rating_floors = c['rating']
+    stores = c['store'].most_common(MAX_STORES)
+    return {
+        'product_type': dict(c['product_type']),
+        'price': [dict(_price_label(i), count=c['price'][i]) for i in sorted(c['price'])],
+        'store': [{'id': store_id, 'name': _store_names.get(store_id), 'count': n} for store_id, n in stores],
+        'rating': {f'{band}_up': sum(n for floor, n in rating_floors.items() if floor >= band) for band in RATING_BANDS},
+        'in_stock': {'true': c['in_stock'][True], 'false': c['in_stock'][False]},
+    }
+
+
+def touch(product_ids):
+    """Mark products changed by a statement that bypassed the ORM (takes effect on commit)."""
+    db.session.info.setdefault('facet_products', set()).update(product_ids)
+
+
+def reset():
+    """Drop every index; categories reload on their next read."""
+    _indexes.clear()
+    _memberships.clear()
+    _pending_products.clear()
+
+
+def _after_flush(session, flush_context):
+    products = session.info.setdefault('facet_products', set())
+    stores = session.info.setdefault('facet_stores', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product):
+            products.add(obj.id)
+        elif isinstance(obj, Store):
+            stores.add(obj.id)
+
+
+def _after_commit(session):
+    if session.info.pop('facet_reset', False):
+        reset()
+    _pending_products.update(session.info.pop('facet_products', ()))
+    _pending_stores.update(session.info.pop('facet_stores', ()))
+
+
+def _after_rollback(session, previous_transaction):
+    if previous_transaction.nested:
+        return
+    session.info.pop('facet_products', None)
+    session.info.pop('facet_stores', None)
+    session.info.pop('facet_reset', None)
+
+
+def _bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get('bump_versions', True) is False:
+        return
+    if getattr(orm_execute_state.statement.table, 'name', None) in ('products', 'product_categories'):
+        orm_execute_state.session.info['facet_reset'] = True
+
+
+def init_app(app):
+    """Register the session listeners that keep the indexes current."""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_soft_rollback', _after_rollback)
+        event.listen(Session, 'do_orm_execute', _bulk)
@@ -0,0 +1,84 @@
+"""
+Sparse fieldsets for API payloads.
+
+Query parameter convention (products, stores, orders, chat):
+- ``fields=id,title,price`` returns only those attributes.
+- ``expand=store,media`` embeds those relationships. Relationships are only
+  serialized (and loaded) when expanded, either here, by naming them in
+  ``fields``, or through a dotted field such as ``fields=store.name``.
+- Dotted fields select attributes of an embedded object: ``store.name``.
+
+Without either parameter the legacy full payload is returned.
+"""
+from flask import request
+
+
+class FieldSet:
+    """Requested attributes and relationships for one serialized object."""
+
+    def __init__(self, fields=None):
+        self.fields = set(fields) if fields is not None else None  # None = every attribute
+        self.expanded = {}  # relationship name -> FieldSet
+
+    def wants(self, name):
+        """True if a plain attribute should be serialized."""
+        return self.fields is None or name in self.fields
+
+    def includes(self, name):
+        """True if a relationship should be loaded and serialized."""
+        return name in self.expanded or (self.fields is not None and name in self.fields)
+
+    def nested(self, name):
+        """FieldSet for an embedded relationship."""
+        return self.expanded.get(name) or FieldSet()
+
+    def pick(self, data):
+        """Drop attributes that were not requested."""
+        if self.fields is None:
+            return data
+        return {k: v for k, v in data.items() if k in self.fields or k in self.expanded}
+
+    def _expand(self, path, fields=None):
+        head, _, rest = path.partition('.')
+        child = self.expanded.setdefault(head, FieldSet(fields))
+        if rest:
+            child._expand(rest, fields)
+        return child
+
+    def _add_field(self, path):
+        head, _, rest = path.partition('.')
+        if not rest:
+            if self.fields is None:
+                self.fields = set()
+            self.fields.add(head)
+            return
+        child = self.expanded.get(head)
+        if child is None:
+            child = self.expanded[head] = FieldSet(set())
+        elif child.fields is None:
+            # Already fully expanded via expand=; dotted fields narrow it
+            child.fields = set()
+        child._add_field(rest)
+
+
+def _split(value):
+    return [part.strip() for part in value.split(',') if part.strip()] if value else []
+
+
+def parse(fields=None, expand=None):
+    """Build a FieldSet from raw ``fields``/``expand`` strings, or None if both are empty."""
+    fields, expand = _split(fields), _split(expand)
+    if not fields and not expand:
+        return None
+
+    fieldset = FieldSet(set() if fields else None)
+    for path in expand:
+        fieldset._expand(path)
+    for path in fields:
+        fieldset._add_field(path)
+    return fieldset
+
+
+def from_request():
+    """FieldSet for the current request's query string, or None for the legacy payload."""
+    return parse(request.args.get('fields'), request.args.get('expand'))
@@ -0,0 +1,167 @@
+"""
+Idempotency-Key support for non-repeatable POST endpoints.
+
+A client that retries a request with the same ``Idempotency-Key`` header gets
+the stored response of the first attempt (marked ``Idempotent-Replayed:
+true``) instead of running the handler again. The key is claimed with a
+placeholder row before the handler runs, so a retry that arrives while the
+first attempt is still in flight gets 409 rather than a duplicate. A
+placeholder is a lease: if it has no response after
+IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS (the worker died), a retry takes it over and
+runs the handler. The handler's first commit also marks the placeholder
+COMMITTED in the same transaction. From then on the key is never released
+or taken over, even if the response cannot be stored, so the handler's work
+is never repeated.
+Keys are scoped per user and kept for IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, jsonify, make_response, current_app
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# status_code of a placeholder whose handler has committed but whose response is not stored yet
+COMMITTED = 0
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode('utf-8'))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _claim(user_id, key, fingerprint):
+    """Insert the placeholder row. Returns it, or None if the key already exists."""
+    now = datetime.utcnow()
+    ttl = timedelta(hours=current_app.config.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    record = IdempotencyKey(user_id=user_id, key=key, fingerprint=fingerprint,
+                            created_at=now, expires_at=now + ttl)
+    db.session.add(record)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    return record
+
+
+def _replay(record):
+    response = current_app.response_class(record.response_body, status=record.status_code,
+                                          mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _abandoned(record, now):
+    """True if record expired, or is a placeholder whose claim outlived its lease."""
+    if record.expires_at < now:
+        return True
+    lease = timedelta(seconds=current_app.config.get('IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS', 120))
+    return record.status_code is None and record.created_at < now - lease
+
+
+def _mark_committed(session):
+    record_id = session.info.pop('idempotency_claim', None)
+    if record_id is not None:
+        session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == record_id, IdempotencyKey.status_code.is_(None))
+            .values(status_code=COMMITTED)
+            .execution_options(bump_versions=False)
+        )
+
+
+def _forget(record_id):
+    db.session.rollback()
+    IdempotencyKey.query.filter_by(id=record_id).delete()
+    db.session.commit()
+
+
+def idempotent(view):
+    """Decorator for JWT-protected POST views; place it below @jwt_required()."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'message': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        user_id = int(get_jwt_identity())
+        fingerprint = _fingerprint()
+        record = _claim(user_id, key, fingerprint)
+        if record is None:
+            existing = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+            if existing is not None and _abandoned(existing, datetime.utcnow()):
+                # Deleting by id is safe if another retry took over first: its claim is a new row
+                _forget(existing.id)
+                record = _claim(user_id, key, fingerprint)
+            elif existing is not None:
+                if existing.fingerprint != fingerprint:
+                    return jsonify({'message': f'{HEADER} was already used for a different request'}), 422
+                if existing.status_code in (None, COMMITTED):
+                    return jsonify({'message': 'A request with this Idempotency-Key is still being processed'}), 409
+                return _replay(existing)
+            if record is None:
+                return jsonify({'message': 'A request with this Idempotency-Key is still being processed'}), 409
+
+        record_id = record.id
+        db.session.info['idempotency_claim'] = record_id
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            if db.session.info.pop('idempotency_claim', None) is not None:
+                _forget(record_id)
+            raise
+        # The marker is gone once the handler has committed its work
+        committed = db.session.info.pop('idempotency_claim', None) is None
+
+        if not committed and (response.status_code >= 500 or response.is_streamed):
+            # Let the client retry failures
+            _forget(record_id)
+            return response
+        if response.is_streamed:
+            return response
+
+        try:
+            IdempotencyKey.query.filter_by(id=record_id).update({
+                'status_code': response.status_code,
+                'response_body': response.get_data(as_text=True),
+            })
+            db.session.commit()
+        except Exception:
+            current_app.logger.exception('Could not store the response for %s %s', HEADER, key)
+            if committed:
+                # Keep the COMMITTED claim: releasing it would let a retry repeat the handler's work
+                db.session.rollback()
+            else:
+                _forget(record_id)
+        return response
+    return wrapped
+
+
+def purge_expired(now=None):
+    """Delete expired keys. Returns the number of rows removed."""
+    deleted = IdempotencyKey.query.filter(IdempotencyKey.expires_at < (now or datetime.utcnow())).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    return deleted
+
+
+def init_app(app):
+    """Register the listener that marks a claim COMMITTED in its handler's transaction."""
+    if not event.contains(Session, 'before_commit', _mark_committed):
+        event.listen(Session, 'before_commit', _mark_committed)
@@ -0,0 +1,189 @@
+"""
+Stock reservations for orders.
+
+Stock is taken from products.stock_quantity when an order is placed, with a
+conditional UPDATE ... WHERE stock_quantity >= :quantity RETURNING id. The
+database applies it atomically, so concurrent buyers can never drive stock
+below zero. Each hold is recorded as a StockReservation:
+
+- active: stock is held. Pending-payment holds expire after
+  STOCK_HOLD_MINUTES; once the buyer confirms payment the hold is kept until
+  the seller decides.
+- committed: the seller approved the order and the stock is sold.
+- released: the order was rejected or the hold expired, and the stock is back.
+
+Status changes are conditional UPDATEs too (WHERE status = 'active'), so an
+approval racing an expiry sweep can only ever win once.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, select, update
+from sqlalchemy.orm.util import identity_key
+
+from app import db
+from app.models import Product, ReservationStatus, StockReservation
+from app.services import etag, facets
+
+
+class InsufficientStock(Exception):
+    """Raised when one or more products cannot cover the requested quantity."""
+
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f'Insufficient stock for products {product_ids}')
+
+
+def hold_expiry():
+    """Expiry time for a new pending-payment hold."""
+    return datetime.utcnow() + timedelta(minutes=current_app.config.get('STOCK_HOLD_MINUTES', 30))
+
+
+def _adjust_stock(quantities, take):
+    """
+    Take (or give back) stock for {product_id: quantity} in one UPDATE.
+    Returns the ids of the products that were updated.
+    """
+    if not quantities:
+        return set()
+    delta = case(quantities, value=Product.id, else_=0)
+    stmt = update(Product).where(Product.id.in_(list(quantities)))
+    if take:
+        stmt = stmt.where(Product.stock_quantity >= delta).values(
+            stock_quantity=Product.stock_quantity - delta,
+            is_in_stock=case((Product.stock_quantity - delta > 0, Product.is_in_stock), else_=False),
+        )
+    else:
+        # Only re-list products that sold out through orders, not ones the seller switched off
+        stmt = stmt.values(
+            stock_quantity=Product.stock_quantity + delta,
+            is_in_stock=case((Product.stock_quantity <= 0, True), else_=Product.is_in_stock),
+        )
+    stmt = stmt.returning(Product.id).execution_options(synchronize_session=False, bump_versions=False)
+    updated = set(db.session.execute(stmt).scalars())
+
+    facets.touch(updated)
+    for product_id in updated:
+        etag.bump('products', product_id)
+        product = db.session.identity_map.get(identity_key(Product, product_id))
+        if product is not None:
+            db.session.expire(product, ['stock_quantity', 'is_in_stock'])
+    return updated
+
+
+def reserve(items, expires_at=None):
+    """
+    Hold stock for (order_id, product_id, quantity) items in one statement.
+    Raises InsufficientStock if any product cannot cover its total; nothing is
+    taken then, but the caller must still roll back its transaction.
+    """
+    items = list(items)
+    quantities = defaultdict(int)
+    for _, product_id, quantity in items:
+        quantities[product_id] += quantity
+
+    taken = _adjust_stock(dict(quantities), take=True)
+    if len(taken) != len(quantities):
+        if taken:
+            _adjust_stock({pid: quantities[pid] for pid in taken}, take=False)
+        raise InsufficientStock(sorted(set(quantities) - taken))
+
+    order_ids = {order_id for order_id, _, _ in items}
+    existing = {
+        (r.order_id, r.product_id): r
+        for r in StockReservation.query.filter(StockReservation.order_id.in_(order_ids))
+    }
+    for order_id, product_id, quantity in items:
+        reservation = existing.get((order_id, product_id))
+        if reservation is None:
+            reservation = StockReservation(order_id=order_id, product_id=product_id)
+            db.session.add(reservation)
+        reservation.quantity = quantity
+        reservation.status = ReservationStatus.ACTIVE.value
+        reservation.expires_at = expires_at
+
+
+def _order_items(order):
+    return [(order.id, product_id, quantity) for product_id, quantity in order.lines]
+
+
+def _transition(where, **values):
+    """Move active reservations matching `where` to a new state; returns (product_id, quantity) rows."""
+    stmt = (
+        update(StockReservation)
+        .where(StockReservation.status == ReservationStatus.ACTIVE.value, *where)
+        .values(updated_at=datetime.utcnow(), **values)
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session='fetch', bump_versions=False)
+    )
+    return db.session.execute(stmt).all()
+
+
+def reserve_order(order):
+    """Hold stock for a newly placed order until the payment window closes."""
+    reserve(_order_items(order), expires_at=hold_expiry())
+
+
+def _unheld_items(orders, status):
+    """Order lines without a reservation in the given status, e.g. holds that expired."""
+    held = {
+        tuple(row) for row in db.session.query(StockReservation.order_id, StockReservation.product_id)
+        .filter(StockReservation.order_id.in_([o.id for o in orders]), StockReservation.status == status)
+    }
+    return [item for order in orders for item in _order_items(order) if (item[0], item[1]) not in held]
+
+
+def hold_for_approval(order):
+    """Keep an order's hold until the seller decides, re-reserving lines whose hold expired."""
+    _transition([StockReservation.order_id == order.id], expires_at=None)
+    missing = _unheld_items([order], ReservationStatus.ACTIVE.value)
+    if missing:
+        reserve(missing)
+
+
+def commit(order):
+    """Convert an order's hold into a sale, taking the stock now for lines no longer held."""
+    commit_many([order])
+
+
+def commit_many(orders):
+    """commit() for several orders with a fixed number of statements."""
+    if not orders:
+        return
+    order_ids = [o.id for o in orders]
+    _transition([StockReservation.order_id.in_(order_ids)], status=ReservationStatus.COMMITTED.value)
+    missing = _unheld_items(orders, ReservationStatus.COMMITTED.value)
+    if missing:
+        reserve(missing)
+        _transition([StockReservation.order_id.in_(order_ids)], status=ReservationStatus.COMMITTED.value)
+
+
+def _give_back(rows):
+    quantities = defaultdict(int)
+    for product_id, quantity in rows:
+        quantities[product_id] += quantity
+    _adjust_stock(dict(quantities), take=False)
+    return len(rows)
+
+
+def release(order_ids):
+    """Return the held stock of the given orders. Returns the number of holds released."""
+    rows = _transition([StockReservation.order_id.in_(list(order_ids))], status=ReservationStatus.RELEASED.value)
+    return _give_back(rows)
+
+
+def release_expired(now=None, batch_size=500):
+    """Release up to batch_size expired holds. The caller commits. Returns the number released."""
+    now = now or datetime.utcnow()
+    expired = (
+        select(StockReservation.id)
+        .where(
+            StockReservation.status == ReservationStatus.ACTIVE.value,
+            StockReservation.expires_at.isnot(None),
+            StockReservation.expires_at < now,
+        )
+        .limit(batch_size)
+    )
+    rows = _transition([StockReservation.id.in_(expired.scalar_subquery())], status=ReservationStatus.RELEASED.value)
+    return _give_back(rows)
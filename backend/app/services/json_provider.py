@@ -0,0 +1,53 @@
+"""
+orjson-backed JSON provider for Flask.
+Falls back to Flask's default provider if orjson is not installed.
+"""
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(obj):
+    """Types orjson does not serialize natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Serializes with orjson: datetime/date/time, UUID, dataclasses and Enum are
+    handled natively, Decimal is converted to float. Non-string dict keys
+    (e.g. the review rating distribution) are allowed.
+    """
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def _option(self):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return self.option | orjson.OPT_INDENT_2
+        return self.option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._option()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._option() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Use the orjson provider when available."""
+    if orjson is not None:
+        app.json_provider_class = OrjsonProvider
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,31 @@
+"""
+Batched notifications: add many Notification rows in one flush and emit them
+after the transaction commits.
+"""
+from app import db, socketio
+from app.models import Notification
+
+
+def build(user_id, title, message, notification_type='order', data=None):
+    """Create and add a Notification without flushing or emitting it."""
+    notification = Notification(
+        user_id=user_id,
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        data=data or {}
+    )
+    db.session.add(notification)
+    return notification
+
+
+def emit(notifications):
+    """Push committed notifications to their users' socket rooms."""
+    for notification in notifications:
+        socketio.emit('notification', {
+            'id': notification.id,
+            'title': notification.title,
+            'message': notification.message,
+            'type': notification.notification_type,
+            'data': notification.data
+        }, room=f'user_{notification.user_id}')
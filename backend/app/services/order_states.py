@@ -0,0 +1,120 @@
+"""
+Order lifecycle state machine.
+
+    pending_payment --confirm_payment--> awaiting_approval --approve--> approved --complete--> completed
+                                                           --reject---> rejected
+    pending_payment / awaiting_approval --expire--> cancelled
+
+guard() checks that an action is allowed for an order and user, and apply()
+performs it for any number of orders with batched stock, counter and sales
+rollup updates. Load the orders through locked(), so two requests acting on
+the same order (or a request and the expiry job) run one after the other and
+the second one guards against the status the first left behind.
+Routes stay responsible for messages, notifications and socket events.
+"""
+from collections import Counter, namedtuple
+from datetime import datetime
+
+from sqlalchemy import case, func, update
+from sqlalchemy.orm.util import identity_key
+
+from app import db
+from app.models import Order, OrderStatus, Product, Store
+from app.services import analytics, etag, inventory
+
+
+Transition = namedtuple('Transition', 'sources target actor')
+
+TRANSITIONS = {
+    'confirm_payment': Transition({OrderStatus.PENDING_PAYMENT.value}, OrderStatus.AWAITING_APPROVAL.value, 'buyer'),
+    'approve': Transition({OrderStatus.AWAITING_APPROVAL.value}, OrderStatus.APPROVED.value, 'seller'),
+    'reject': Transition({OrderStatus.AWAITING_APPROVAL.value}, OrderStatus.REJECTED.value, 'seller'),
+    'complete': Transition({OrderStatus.APPROVED.value}, OrderStatus.COMPLETED.value, 'buyer'),
+    'expire': Transition(
+        {OrderStatus.PENDING_PAYMENT.value, OrderStatus.AWAITING_APPROVAL.value},
+        OrderStatus.CANCELLED.value,
+        None,
+    ),
+}
+
+
+class InvalidTransition(Exception):
+    """An action that is not allowed for an order in its current state or for this user."""
+
+    def __init__(self, message, status_code=400):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+def locked(query):
+    """Order query whose rows stay locked FOR UPDATE until commit, reloaded with their current status."""
+    return query.with_for_update(of=Order).populate_existing()
+
+
+def guard(order, action, user_id=None):
+    """Raise InvalidTransition unless user_id may perform action on order."""
+    transition = TRANSITIONS.get(action)
+    if transition is None:
+        raise InvalidTransition(f'Unknown action: {action}')
+    if transition.actor == 'buyer' and order.buyer_id != user_id:
+        raise InvalidTransition('Unauthorized', 403)
+    if transition.actor == 'seller' and order.store.owner_id != user_id:
+        raise InvalidTransition('Unauthorized', 403)
+    if order.status not in transition.sources:
+        raise InvalidTransition('Invalid order status')
+
+
+def _increment_total_orders(model, counts):
+    """Add {id: n} to model.total_orders in one UPDATE, so concurrent approvals cannot lose counts."""
+    if not counts:
+        return
+    db.session.execute(
+        update(model)
+        .where(model.id.in_(list(counts)))
+        .values(total_orders=func.coalesce(model.total_orders, 0) + case(counts, value=model.id, else_=0))
+        .execution_options(synchronize_session=False, bump_versions=False)
+    )
+    for row_id in counts:
+        etag.bump(model.__tablename__, row_id)
+        obj = db.session.identity_map.get(identity_key(model, row_id))
+        if obj is not None:
+            db.session.expire(obj, ['total_orders'])
+
+
+def _count_sales(orders):
+    _increment_total_orders(Product, Counter(product_id for order in orders for product_id, _ in order.lines))
+    _increment_total_orders(Store, Counter(order.store_id for order in orders))
+
+
+def apply(orders, action, reason=None, now=None):
+    """
+    Move guarded orders to the action's target state in the current transaction.
+    Raises inventory.InsufficientStock when approving orders whose stock is gone.
+    """
+    transition = TRANSITIONS[action]
+    now = now or datetime.utcnow()
+    orders = list(orders)
+
+    if action == 'confirm_payment':
+        for order in orders:
+            inventory.hold_for_approval(order)
+    elif action == 'approve':
+        inventory.commit_many(orders)
+        _count_sales(orders)
+    elif action in ('reject', 'expire'):
+        inventory.release([order.id for order in orders])
+
+    for order in orders:
+        order.status = transition.target
+        if action == 'confirm_payment':
+            order.payment_confirmed_at = now
+        elif action == 'approve':
+            order.approved_at = now
+        elif action == 'complete':
+            order.completed_at = now
+        if reason and action in ('reject', 'expire'):
+            order.seller_note = reason
+    analytics.record(orders, transition.target, now)
+    db.session.flush()
+    return orders
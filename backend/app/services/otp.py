@@ -0,0 +1,75 @@
+"""
+One-time codes for email verification and password reset.
+
+issue() creates a code and marks every earlier unused code for the same
+email and purpose as used, so only the latest code sent works. consume()
+looks a code up through the composite index on (email, purpose, otp_code,
+is_used, expires_at). An hourly job runs purge(), which deletes expired and
+used rows in batches, so otp_logs only holds live codes.
+"""
+import secrets
+import string
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, or_, select, update
+
+from app import db
+from app.models import OtpLog
+
+
+VERIFICATION = 'verification'
+PASSWORD_RESET = 'password_reset'
+
+TTL_MINUTES = 10
+PURGE_BATCH_SIZE = 1000
+
+
+def generate():
+    """A random 6-digit code."""
+    return ''.join(secrets.choice(string.digits) for _ in range(6))
+
+
+def issue(email, purpose, now=None):
+    """Create a code for email, superseding older ones. The caller commits and sends it."""
+    now = now or datetime.utcnow()
+    db.session.execute(
+        update(OtpLog)
+        .where(OtpLog.email == email, OtpLog.purpose == purpose, OtpLog.is_used == False)
+        .values(is_used=True)
+        .execution_options(bump_versions=False)
+    )
+    code = generate()
+    db.session.add(OtpLog(email=email, otp_code=code, purpose=purpose, expires_at=now + timedelta(minutes=TTL_MINUTES)))
+    return code
+
+
+def consume(email, code, purpose, now=None):
+    """Mark a valid code as used and return its row, or None if there is none. The caller commits."""
+    otp_log = OtpLog.query.filter(
+        OtpLog.email == email,
+        OtpLog.purpose == purpose,
+        OtpLog.otp_code == code,
+        OtpLog.is_used == False,
+        OtpLog.expires_at > (now or datetime.utcnow()),
+    ).first()
+    if otp_log:
+        otp_log.is_used = True
+    return otp_log
+
+
+def purge(now=None, batch_size=PURGE_BATCH_SIZE):
+    """Delete expired and used codes, batch_size rows per transaction. Returns rows removed."""
+    now = now or datetime.utcnow()
+    removed = 0
+    while True:
+        ids = db.session.scalars(
+            select(OtpLog.id).where(or_(OtpLog.expires_at <= now, OtpLog.is_used == True)).limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        db.session.execute(delete(OtpLog).where(OtpLog.id.in_(ids)).execution_options(bump_versions=False))
+        db.session.commit()
+        removed += len(ids)
+        if len(ids) < batch_size:
+            break
+    return removed
@@ -0,0 +1,58 @@
+"""
+Password hashing.
+
+bcrypt is deliberately slow, at about 250 ms per hash at cost 12. The app
+runs as one eventlet worker, so a hash computed on the hub would stall every
+HTTP request and socket for that long. When eventlet has patched threading,
+hash_password() and check_password() run bcrypt in eventlet's native thread
+pool (tpool). bcrypt releases the GIL, so the hub keeps serving meanwhile.
+Outside eventlet (CLI, tests) they call bcrypt directly.
+
+The cost is BCRYPT_LOG_ROUNDS. A hash made at a different cost is upgraded
+on the next successful login (see needs_rehash()).
+"""
+import bcrypt
+from flask import current_app
+
+
+DEFAULT_ROUNDS = 12
+
+
+def _rounds():
+    return current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS)
+
+
+def _offload(func, *args):
+    """Run func in eventlet's thread pool when running under a patched eventlet hub."""
+    if current_app.config.get('PASSWORD_HASH_THREADPOOL', True):
+        try:
+            from eventlet import patcher, tpool
+        except ImportError:  # pragma: no cover - eventlet is optional outside the server
+            patcher = None
+        if patcher is not None and patcher.is_monkey_patched('thread'):
+            return tpool.execute(func, *args)
+    return func(*args)
+
+
+def hash_password(password):
+    """bcrypt hash of password at the configured cost, as text."""
+    hashed = _offload(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds=_rounds()))
+    return hashed.decode('utf-8')
+
+
+def check_password(password, password_hash):
+    """True if password matches password_hash."""
+    if not password_hash:
+        return False
+    try:
+        return _offload(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:  # malformed hash
+        return False
+
+
+def needs_rehash(password_hash):
+    """True if password_hash was made at a cost other than BCRYPT_LOG_ROUNDS."""
+    try:
+        return int(password_hash.split('$')[2]) != _rounds()
+    except (AttributeError, IndexError, ValueError):
+        return True
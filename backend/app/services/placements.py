@@ -0,0 +1,270 @@
+"""
+Live ad and featured placements.
+
+The set of placements that are live right now only changes when an admin
+edits one or when a start/end time passes. Instead of filtering
+starts_at <= now <= ends_at on every request, the live set is computed once
+into an in-process Snapshot. The snapshot records when the next scheduled
+start or end happens, and get() rebuilds it once that time has passed or
+after invalidate() was called. Read endpoints just slice the snapshot.
+
+The snapshot also carries the boost table for paid category_top and
+search_boost listings: product ids per category, and each boosted product's
+searchable text. A search term is matched against that text in memory and
+the result is memoized per snapshot. boosted_page() shows a few of those
+ids above page 1 of a listing, rotating between calls. No request joins
+featured_listings.
+
+sweep() runs from the scheduler. It moves expired featured listings and ad
+requests to 'expired', switches off ended banners and keeps
+Product.is_featured in line with live home_featured listings.
+"""
+import itertools
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from sqlalchemy import and_, exists, or_, select, update
+
+from app import db
+from app.models import AdRequest, AdsBanner, Category, FeaturedListing, Product, product_categories
+
+
+# Upper bound on snapshot age, so changes made by another process are picked up
+MAX_AGE_SECONDS = 300
+
+# Boosted products shown above the first page of a category or search
+BOOST_SLOTS = 2
+
+Snapshot = namedtuple('Snapshot', 'ads featured_ids category_boosts search_boosts search_terms next_transition built_at')
+
+_snapshot = None
+_boost_cursor = itertools.count()
+
+
+def _live_listing(now, listing_type='home_featured'):
+    return and_(
+        FeaturedListing.status == 'approved',
+        FeaturedListing.listing_type == listing_type,
+        FeaturedListing.starts_at <= now,
+        FeaturedListing.expires_at > now,
+    )
+
+
+def _ad_dict(ad_id, source, title, image_url, link_url, position):
+    return {
+        'id': ad_id,
+        'source': source,
+        'title': title,
+        'image_url': image_url,
+        'link_url': link_url,
+        'position': position,
+    }
+
+
+def build(now=None):
+    """Compute the placements live at `now` and when that set next changes."""
+    now = now or datetime.utcnow()
+    upcoming = []
+    live = []
+
+    banners = db.session.execute(
+        select(AdsBanner.id, AdsBanner.title, AdsBanner.image_url, AdsBanner.link_url, AdsBanner.position,
+               AdsBanner.starts_at, AdsBanner.ends_at, AdsBanner.created_at)
+        .where(AdsBanner.is_active == True, AdsBanner.is_approved == True, AdsBanner.ends_at >= now)
+    ).all()
+    for b in banners:
+        if b.starts_at > now:
+            upcoming.append(b.starts_at)
+            continue
+        upcoming.append(b.ends_at)
+        live.append((b.created_at, _ad_dict(b.id, 'banner', b.title, b.image_url, b.link_url, b.position)))
+
+    requests = db.session.execute(
+        select(AdRequest.id, AdRequest.image_url, AdRequest.link_url, AdRequest.placement,
+               AdRequest.starts_at, AdRequest.expires_at, AdRequest.approved_at)
+        .where(AdRequest.status == 'approved', AdRequest.expires_at > now)
+    ).all()
+    for r in requests:
+        if r.starts_at and r.starts_at > now:
+            upcoming.append(r.starts_at)
+            continue
+        upcoming.append(r.expires_at)
+        live.append((r.approved_at, _ad_dict(r.id, 'request', None, r.image_url, r.link_url, r.placement)))
+
+    ads = {}
+    for _, ad in sorted(live, key=lambda item: item[0] or datetime.min, reverse=True):
+        ads.setdefault(ad['position'], []).append(ad)
+        ads.setdefault(None, []).append(ad)
+
+    # Listings that start or end later also change is_featured, via sweep()
+    upcoming.extend(db.session.execute(
+        select(FeaturedListing.starts_at).where(FeaturedListing.status == 'approved', FeaturedListing.starts_at > now)
+    ).scalars())
+    upcoming.extend(db.session.execute(
+        select(FeaturedListing.expires_at).where(FeaturedListing.status == 'approved', FeaturedListing.expires_at > now)
+    ).scalars())
+
+    # Live listings count straight away, before sweep() has set is_featured
+    listed = exists().where(FeaturedListing.product_id == Product.id, _live_listing(now))
+    featured_ids = tuple(db.session.execute(
+        select(Product.id)
+        .where(Product.is_active == True, or_(Product.is_featured == True, listed))
+        .order_by(Product.created_at.desc())
+    ).scalars())
+
+    category_boosts = defaultdict(list)
+    for category_id, product_id in db.session.execute(
+        select(product_categories.c.category_id, FeaturedListing.product_id)
+        .join(product_categories, product_categories.c.product_id == FeaturedListing.product_id)
+        .join(Product, Product.id == FeaturedListing.product_id)
+        .where(_live_listing(now, 'category_top'), Product.is_active == True)
+        .order_by(FeaturedListing.approved_at)
+    ):
+        if product_id not in category_boosts[category_id]:
+            category_boosts[category_id].append(product_id)
+
+    search_text = {}
+    for product_id, title, category_name in db.session.execute(
+        select(Product.id, Product.title, Category.name)
+        .join(FeaturedListing, FeaturedListing.product_id == Product.id)
+        .outerjoin(product_categories, product_categories.c.product_id == Product.id)
+        .outerjoin(Category, Category.id == product_categories.c.category_id)
+        .where(_live_listing(now, 'search_boost'), Product.is_active == True)
+        .order_by(FeaturedListing.approved_at)
+    ):
+        text = search_text.setdefault(product_id, [title.lower()])
+        if category_name:
+            text.append(category_name.lower())
+
+    return Snapshot(
+        ads={position: tuple(items) for position, items in ads.items()},
+        featured_ids=featured_ids,
+        category_boosts={category_id: tuple(ids) for category_id, ids in category_boosts.items()},
+        search_boosts=tuple((product_id, tuple(text)) for product_id, text in search_text.items()),
+        search_terms={},
+        next_transition=min((t for t in upcoming if t), default=None),
+        built_at=time.monotonic(),
+    )
+
+
+def get(now=None):
+    """The current snapshot, rebuilt when it is stale."""
+    global _snapshot
+    now = now or datetime.utcnow()
+    snapshot = _snapshot
+    if (
+        snapshot is None
+        or (snapshot.next_transition is not None and now >= snapshot.next_transition)
+        or time.monotonic() - snapshot.built_at > MAX_AGE_SECONDS
+    ):
+        snapshot = _snapshot = build(now)
+    return snapshot
+
+
+def invalidate():
+    """Drop the snapshot; call after committing a change to ads, listings or featured products."""
+    global _snapshot
+    _snapshot = None
+
+
+def ads(position=None):
+    """Live ads for a position (all positions when None)."""
+    return list(get().ads.get(position, ()))
+
+
+def featured_ids(limit=None):
+    """Ids of featured products, newest first."""
+    ids = get().featured_ids
+    return list(ids[:limit] if limit else ids)
+
+
+def category_boosts(category_id):
+    """Ids of products with a live category_top listing in a category."""
+    return get().category_boosts.get(category_id, ())
+
+
+def search_boosts(term):
+    """Ids of products with a live search_boost listing that match a search term."""
+    snapshot = get()
+    term = term.strip().lower()
+    ids = snapshot.search_terms.get(term)
+    if ids is None:
+        # Same matching as the search itself: the term appears in the title or a category name
+        ids = tuple(product_id for product_id, text in snapshot.search_boosts if any(term in t for t in text))
+        if len(snapshot.search_terms) < 10000:
+            snapshot.search_terms[term] = ids
+    return ids
+
+
+def boosted_page(ids, query, pq):
+    """
+    Run page pq of `query` with boosted products from `ids` above page 1.
+    Up to BOOST_SLOTS of the ids that match query are shown, rotating
+    between calls and preferring ones not already among page 1's rows, and
+    always leaving room for one organic row. The number of slots depends
+    only on how many ids match, so every page agrees on it and the organic
+    rows shift down by that many with no gaps (see ProductQuery.paginate).
+    Boosted products keep their organic place, on whatever page that is.
+    Returns (boosts, products, pagination).
+    """
+    slots = min(BOOST_SLOTS, pq.limit - 1)
+    if not ids or slots <= 0 or pq.cursor is not None:
+        products, pagination = pq.paginate(query)
+        return [], products, pagination
+    matching = query.filter(Product.id.in_(ids))
+    if not pq.first_page:
+        products, pagination = pq.paginate(query, min(slots, matching.order_by(None).count()))
+        return [], products, pagination
+
+    by_id = {p.id: p for p in matching}
+    lead = min(slots, len(by_id))
+    products, pagination = pq.paginate(query, lead)
+    start = next(_boost_cursor) % len(ids)
+    shown = {p.id for p in products}
+    rotated = sorted((by_id[i] for i in ids[start:] + ids[:start] if i in by_id), key=lambda p: p.id in shown)
+    return rotated[:lead], products, pagination
+
+
+def sweep(now=None):
+    """Expire ended placements and sync Product.is_featured. The caller commits. Returns rows changed."""
+    now = now or datetime.utcnow()
+    changed = 0
+
+    expired_products = db.session.execute(
+        update(FeaturedListing)
+        .where(FeaturedListing.status == 'approved', FeaturedListing.expires_at <= now)
+        .values(status='expired')
+        .returning(FeaturedListing.product_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    changed += len(expired_products)
+
+    live = exists().where(FeaturedListing.product_id == Product.id, _live_listing(now))
+    if expired_products:
+        changed += db.session.execute(
+            update(Product)
+            .where(Product.id.in_(set(expired_products)), Product.is_featured == True, ~live)
+            .values(is_featured=False)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    changed += db.session.execute(
+        update(Product)
+        .where(Product.is_featured == False, live)
+        .values(is_featured=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    changed += db.session.execute(
+        update(AdRequest)
+        .where(AdRequest.status == 'approved', AdRequest.expires_at <= now)
+        .values(status='expired')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    changed += db.session.execute(
+        update(AdsBanner)
+        .where(AdsBanner.is_active == True, AdsBanner.ends_at < now)
+        .values(is_active=False)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return changed
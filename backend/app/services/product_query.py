@@ -0,0 +1,196 @@
+"""
+Product listing queries.
+
+Every product listing (all products, search, category and store pages)
+parses its query string with ProductQuery.from_request(). Build the query
+with build() and page through it with paginate(), so filters, sorting,
+pagination and eager loading are defined in one place.
+
+Query parameters:
+- ``q``: text in the title or in a category name
+- ``type``: product type
+- ``category``: one or more category ids, comma separated (any of them)
+- ``store_type``: general, kitchen or service
+- ``min_price`` / ``max_price``
+- ``in_stock=true``
+- ``sort``: newest (default), price_low, price_high, popular or rating
+- ``page`` / ``limit``, or ``cursor`` for keyset pagination. Every response
+  includes ``next_cursor``. Following it skips both the OFFSET scan and the
+  COUNT query.
+
+Shapes are chosen to match the indexes. Category, store type and search
+predicates are EXISTS / IN semi-joins instead of joins, so no DISTINCT is
+needed. Every sort has products.id as a unique tiebreaker, so offset and
+cursor pages are stable.
+"""
+import base64
+import json
+import math
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import exists, select, tuple_
+
+from app.models import Category, Product, Store, product_categories
+
+
+MAX_LIMIT = 100
+
+# sort name -> (column, ascending, type of the cursor value)
+SORTS = {
+    'newest': (Product.created_at, False, datetime.fromisoformat),
+    'price_low': (Product.price, True, Decimal),
+    'price_high': (Product.price, False, Decimal),
+    'popular': (Product.total_orders, False, int),
+    'rating': (Product.rating, False, float),
+}
+
+_TRUE = ('1', 'true', 'yes')
+
+
+def _encode_cursor(value, product_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    raw = json.dumps([value, product_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor, parse):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    value, product_id = json.loads(raw)
+    return parse(value), int(product_id)
+
+
+class ProductQuery:
+    """Filters, sort and page of one product listing request."""
+
+    def __init__(self, q=None, product_type=None, category_ids=None, store_id=None, store_type=None,
+                 min_price=None, max_price=None, in_stock=False, sort='newest', page=1, limit=20, cursor=None):
+        self.q = q
+        self.product_type = product_type
+        self.category_ids = category_ids or []
+        self.store_id = store_id
+        self.store_type = store_type
+        self.min_price = min_price
+        self.max_price = max_price
+        self.in_stock = in_stock
+        self.sort = sort if sort in SORTS else 'newest'
+        self.page = max(page, 1)
+        self.limit = min(max(limit, 1), MAX_LIMIT)
+        self.cursor = cursor
+        self.error = None
+
+    @classmethod
+    def from_request(cls, args, **fixed):
+        """Parse request.args. Keyword arguments (e.g. category_ids, store_id) are set by the route."""
+        pq = cls(
+            q=(args.get('q') or '').strip() or None,
+            product_type=args.get('type') or None,
+            store_type=args.get('store_type') or None,
+            min_price=args.get('min_price', type=float),
+            max_price=args.get('max_price', type=float),
+            in_stock=(args.get('in_stock') or '').lower() in _TRUE,
+            sort=args.get('sort', 'newest'),
+            page=args.get('page', 1, type=int),
+            limit=args.get('limit', 20, type=int),
+        )
+        category = args.get('category')
+        if category:
+            try:
+                pq.category_ids = [int(c) for c in category.split(',') if c.strip()]
+            except ValueError:
+                pq.error = 'category must be a comma-separated list of ids'
+        cursor = args.get('cursor')
+        if cursor:
+            try:
+                pq.cursor = _decode_cursor(cursor, SORTS[pq.sort][2])
+            except (ValueError, TypeError, InvalidOperation):
+                pq.error = 'Invalid cursor'
+        for name, value in fixed.items():
+            setattr(pq, name, value)
+        return pq
+
+    @property
+    def first_page(self):
+        return self.cursor is None and self.page == 1
+
+    def _filters(self):
+        filters = [Product.is_active == True]
+        if self.store_id is not None:
+            filters.append(Product.store_id == self.store_id)
+        if self.product_type:
+            filters.append(Product.product_type == self.product_type)
+        if self.min_price is not None:
+            filters.append(Product.price >= self.min_price)
+        if self.max_price is not None:
+            filters.append(Product.price <= self.max_price)
+        if self.in_stock:
+            filters.append(Product.is_in_stock == True)
+            filters.append(Product.stock_quantity > 0)
+        if self.category_ids:
+            filters.append(exists().where(
+                product_categories.c.product_id == Product.id,
+                product_categories.c.category_id.in_(self.category_ids),
+            ))
+        if self.store_type:
+            filters.append(Product.store_id.in_(select(Store.id).where(Store.store_type == self.store_type)))
+        if self.q:
+            pattern = f'%{self.q}%'
+            filters.append(Product.title.ilike(pattern) | Product.categories.any(Category.name.ilike(pattern)))
+        return filters
+
+    def build(self, fieldset=None, include_store=False):
+        """Filtered and sorted Product query with the eager loads the serializer needs."""
+        column, ascending, _ = SORTS[self.sort]
+        query = Product.query.options(*Product.load_options(fieldset, include_store=include_store)).filter(
+            *self._filters()
+        )
+        if self.cursor is not None:
+            key, after = tuple_(column, Product.id), tuple_(*self.cursor)
+            query = query.filter(key > after if ascending else key < after)
+        if ascending:
+            return query.order_by(column.asc(), Product.id.asc())
+        return query.order_by(column.desc(), Product.id.desc())
+
+    def cursor_after(self, product):
+        """Cursor for the page that starts after `product` in this sort."""
+        return _encode_cursor(getattr(product, SORTS[self.sort][0].key), product.id)
+
+    def _next_cursor(self, items):
+        if len(items) < self.limit:
+            return None
+        return self.cursor_after(items[-1])
+
+    def paginate(self, query, lead=0):
+        """
+        Run the query for this page. Returns (products, pagination dict).
+        `lead` rows at the top of page 1 are filled by the caller (boosted
+        listings), so page 1 holds limit - lead rows and every later page
+        starts lead rows earlier. Page numbers then leave no gaps.
+        """
+        if self.cursor is not None:
+            items = query.limit(self.limit).all()
+            return items, {'limit': self.limit, 'next_cursor': self._next_cursor(items)}
+
+        if lead:
+            size = self.limit - lead if self.page == 1 else self.limit
+            items = query.offset(max((self.page - 1) * self.limit - lead, 0)).limit(size).all()
+            total = query.order_by(None).count()
+            return items, {
+                'page': self.page,
+                'limit': self.limit,
+                'total': total,
+                'pages': math.ceil((total + lead) / self.limit),
+                'next_cursor': self.cursor_after(items[-1]) if items and len(items) == size else None,
+            }
+
+        pagination = query.paginate(page=self.page, per_page=self.limit, error_out=False)
+        return pagination.items, {
+            'page': self.page,
+            'limit': self.limit,
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'next_cursor': self._next_cursor(pagination.items),
+        }
@@ -0,0 +1,159 @@
+"""
+Token-bucket rate limiting for the unauthenticated auth endpoints.
+
+Each rule in LIMITS is a bucket per endpoint, scope and value (the client IP
+or the email in the request body). A bucket holds up to `capacity` tokens
+and refills at capacity / period per second. Every request takes one token
+from each of its buckets. A request that finds a bucket empty gets 429 and a
+Retry-After header saying when the next token arrives. Rules whose value is
+missing (e.g. no email in the body) are skipped.
+
+Two backends keep the buckets:
+- ``memory`` (default): an LRU dict in process memory, which fits the
+  single-worker deployment.
+- ``database``: rows in rate_limit_buckets, locked with SELECT ... FOR
+  UPDATE. All workers share them.
+Either way a check is one dictionary or primary-key lookup per rule.
+Set RATE_LIMIT_BACKEND to choose, or RATE_LIMIT_ENABLED=false to turn
+limiting off.
+"""
+import math
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from sqlalchemy import select, update
+
+from app import db
+from app.models import RateLimitBucket
+from app.services import dialect
+
+
+# endpoint -> [(scope, capacity, period in seconds)]
+LIMITS = {
+    'login': [('ip', 20, 60), ('email', 5, 60)],
+    'register': [('ip', 5, 3600)],
+    'resend-otp': [('ip', 10, 3600), ('email', 3, 900)],
+    'forgot-password': [('ip', 10, 3600), ('email', 3, 900)],
+}
+
+MAX_MEMORY_BUCKETS = 100000
+
+# Database buckets untouched this long are full again and can be deleted
+STALE_SECONDS = 86400
+
+
+def _refill(tokens, refilled_at, now, capacity, rate):
+    """Take one token. Returns (tokens left, seconds until one is available or 0 if taken)."""
+    tokens = min(capacity, tokens + max(now - refilled_at, 0) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBackend:
+    """Buckets in process memory, least recently used evicted first."""
+
+    def __init__(self, maxsize=MAX_MEMORY_BUCKETS):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+
+    def take(self, key, capacity, rate, now):
+        tokens, refilled_at = self._buckets.get(key, (capacity, now))
+        tokens, wait = _refill(tokens, refilled_at, now, capacity, rate)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def reset(self):
+        self._buckets.clear()
+
+
+class DatabaseBackend:
+    """Buckets in the rate_limit_buckets table, shared by every worker."""
+
+    def take(self, key, capacity, rate, now):
+        db.session.execute(
+            dialect.insert()(RateLimitBucket)
+            .values(key=key, tokens=capacity, refilled_at=now)
+            .on_conflict_do_nothing(index_elements=['key'])
+        )
+        bucket = db.session.execute(
+            select(RateLimitBucket.tokens, RateLimitBucket.refilled_at)
+            .where(RateLimitBucket.key == key)
+            .with_for_update()
+        ).one()
+        tokens, wait = _refill(bucket.tokens, bucket.refilled_at, now, capacity, rate)
+        db.session.execute(
+            update(RateLimitBucket).where(RateLimitBucket.key == key).values(tokens=tokens, refilled_at=now)
+            .execution_options(bump_versions=False)
+        )
+        db.session.commit()
+        return wait
+
+    def reset(self):
+        RateLimitBucket.query.delete()
+        db.session.commit()
+
+
+_backends = {'memory': MemoryBackend(), 'database': DatabaseBackend()}
+
+
+def backend():
+    return _backends[current_app.config.get('RATE_LIMIT_BACKEND', 'memory')]
+
+
+def _scope_value(scope):
+    if scope == 'ip':
+        return request.remote_addr
+    if scope == 'email':
+        data = request.get_json(silent=True) or {}
+        return str(data.get('email') or '').strip().lower() or None
+    raise ValueError(f'Unknown rate limit scope: {scope}')
+
+
+def check(endpoint):
+    """Take a token from every bucket of endpoint. Returns seconds to wait, or 0 if allowed."""
+    store = backend()
+    now = time.time()
+    for scope, capacity, period in LIMITS[endpoint]:
+        value = _scope_value(scope)
+        if value is None:
+            continue
+        wait = store.take(f'{endpoint}:{scope}:{value}', capacity, capacity / period, now)
+        if wait:
+            return wait
+    return 0
+
+
+def limit(endpoint):
+    """Decorator: answer 429 with Retry-After when a bucket of `endpoint` is empty."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if current_app.config.get('RATE_LIMIT_ENABLED', True):
+                wait = check(endpoint)
+                if wait:
+                    retry_after = max(1, math.ceil(wait))
+                    response = jsonify({
+                        'message': f'Too many requests. Try again in {retry_after} seconds.',
+                        'error': 'rate_limited',
+                        'retry_after': retry_after,
+                    })
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(retry_after)
+                    return response
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def purge_stale(now=None):
+    """Delete database buckets idle for STALE_SECONDS (they would be full again). Returns rows removed."""
+    cutoff = (now or time.time()) - STALE_SECONDS
+    deleted = RateLimitBucket.query.filter(RateLimitBucket.refilled_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
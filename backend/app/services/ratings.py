@@ -0,0 +1,164 @@
+"""
+Review rating rollups.
+
+product_rating_stats keeps a per-star count and the rating sum of every
+visible review (approved and not hidden) of a product. Stores keep the same
+sum/count on their own row (rating_sum, total_reviews), so the store rating
+is the mean of all its visible reviews. Review writes adjust both with single
+UPDATEs in the caller's transaction, so neither reading the stats nor writing
+a review ever scans the reviews or products tables.
+"""
+from sqlalchemy import case, func, select, update, cast, Numeric
+
+from app import db
+from app.models import Product, ProductRatingStats, Review, Store
+from app.services import dialect, etag
+
+
+STARS = range(1, 6)
+
+
+def is_visible(review):
+    """Whether a review counts towards the public rating."""
+    return bool(review.is_approved) and not review.is_hidden
+
+
+def _ensure_row(product_id):
+    values = {'product_id': product_id, 'rating_sum': 0}
+    values.update({f'count_{star}': 0 for star in STARS})
+    stmt = dialect.insert()(ProductRatingStats).values(**values).on_conflict_do_nothing(
+        index_elements=['product_id']
+    )
+    db.session.execute(stmt)
+
+
+def apply(product_id, rating, delta):
+    """
+    Add (delta=1) or remove (delta=-1) one visible review of `rating` stars,
+    refresh the product's denormalized rating/total_reviews and adjust the
+    store counters. Returns the stats row, or None for an out-of-range rating.
+    """
+    if rating not in STARS:
+        return None
+
+    _ensure_row(product_id)
+    column = getattr(ProductRatingStats, f'count_{rating}')
+    stmt = (
+        update(ProductRatingStats)
+        .where(ProductRatingStats.product_id == product_id)
+        .values({column: column + delta, ProductRatingStats.rating_sum: ProductRatingStats.rating_sum + delta * rating})
+        .returning(ProductRatingStats)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    stats = db.session.execute(stmt).scalars().one()
+
+    product = db.session.get(Product, product_id)
+    if product is not None:
+        product.total_reviews = stats.total
+        product.rating = stats.average
+        _apply_store(product.store_id, rating, delta)
+    return stats
+
+
+def _average(rating_sum, count):
+    return func.coalesce(func.round(cast(rating_sum, Numeric) / func.nullif(count, 0), 1), 0)
+
+
+def _apply_store(store_id, rating, delta):
+    """O(1) store counter update; SET expressions see the pre-update values."""
+    count = func.coalesce(Store.total_reviews, 0) + delta
+    rating_sum = func.coalesce(Store.rating_sum, 0) + delta * rating
+    db.session.execute(
+        update(Store)
+        .where(Store.id == store_id)
+        .values(total_reviews=count, rating_sum=rating_sum, rating=_average(rating_sum, count))
+        .execution_options(synchronize_session='fetch', bump_versions=False)
+    )
+    etag.bump('stores', store_id)
+
+
+def review_added(review):
+    if is_visible(review):
+        return apply(review.product_id, review.rating, 1)
+    return None
+
+
+def review_removed(review):
+    if is_visible(review):
+        return apply(review.product_id, review.rating, -1)
+    return None
+
+
+def visibility_changed(review, was_visible):
+    """Call after toggling is_hidden/is_approved on a review."""
+    now_visible = is_visible(review)
+    if now_visible and not was_visible:
+        return apply(review.product_id, review.rating, 1)
+    if was_visible and not now_visible:
+        return apply(review.product_id, review.rating, -1)
+    return None
+
+
+def get_stats(product_id):
+    """Stats payload for a product: {'average', 'total', 'distribution'}."""
+    stats = db.session.get(ProductRatingStats, product_id)
+    if stats is None:
+        return ProductRatingStats(rating_sum=0, **{f'count_{star}': 0 for star in STARS}).to_dict()
+    return stats.to_dict()
+
+
+def rebuild():
+    """Recompute every stats row and product rating from the reviews table. Returns the row count."""
+    visible = db.and_(Review.is_approved == True, Review.is_hidden == False)
+    columns = ['product_id', 'rating_sum'] + [f'count_{star}' for star in STARS]
+    source = (
+        select(
+            Review.product_id,
+            func.sum(Review.rating),
+            *[func.sum(case((Review.rating == star, 1), else_=0)) for star in STARS],
+        )
+        .where(visible)
+        .group_by(Review.product_id)
+    )
+
+    db.session.execute(db.delete(ProductRatingStats))
+    db.session.execute(db.insert(ProductRatingStats).from_select(columns, source))
+
+    stats = ProductRatingStats.__table__.c
+    total = stats.count_1 + stats.count_2 + stats.count_3 + stats.count_4 + stats.count_5
+    own_row = stats.product_id == Product.id
+    db.session.execute(
+        update(Product).values(
+            total_reviews=func.coalesce(select(total).where(own_row).scalar_subquery(), 0),
+            rating=func.coalesce(select(_average(stats.rating_sum, total)).where(own_row).scalar_subquery(), 0),
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(ProductRatingStats))
+
+
+def recompute_store_ratings():
+    """
+    Drift correction: recompute every store's review count, sum and rating from
+    the reviews table in one UPDATE. Returns the number of stores updated.
+    """
+    visible = db.and_(Review.is_approved == True, Review.is_hidden == False)
+
+    def store_total(expr):
+        return func.coalesce(
+            select(func.sum(expr))
+            .select_from(Review)
+            .join(Product, Product.id == Review.product_id)
+            .where(Product.store_id == Store.id, visible)
+            .scalar_subquery(),
+            0,
+        )
+
+    count, rating_sum = store_total(1), store_total(Review.rating)
+    result = db.session.execute(
+        update(Store)
+        .values(total_reviews=count, rating_sum=rating_sum, rating=_average(rating_sum, count))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
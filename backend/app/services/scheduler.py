@@ -0,0 +1,126 @@
+"""
+Lightweight in-process job scheduler.
+
+Jobs are plain functions registered with an interval. A single background
+task (a green thread under eventlet, via socketio.start_background_task)
+wakes up every SCHEDULER_TICK_SECONDS and runs the jobs that are due.
+
+Coordination happens through the job_leases table: a job is due when its
+lease row has expired, and a worker claims it with a conditional UPDATE that
+pushes the expiry one interval ahead. Only one worker can win that UPDATE, so
+with several processes (or a cron calling `flask run-jobs`) each job still
+runs once per interval.
+
+The loop starts lazily on the first request, so CLI commands such as
+`flask db upgrade` never start it. Set SCHEDULER_ENABLED=false to disable it.
+"""
+import logging
+import os
+import socket
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app import db, socketio
+from app.models import JobLease
+
+
+logger = logging.getLogger(__name__)
+
+Job = namedtuple('Job', 'name interval func')
+
+OWNER = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+
+_jobs = {}
+_started = False
+
+
+def register(name, interval, func):
+    """Register func to run every `interval` (a timedelta)."""
+    _jobs[name] = Job(name, interval, func)
+
+
+def job(name, every):
+    """Decorator form of register()."""
+    def decorator(func):
+        register(name, every, func)
+        return func
+    return decorator
+
+
+def acquire(name, interval, now=None):
+    """Claim the lease for a due job. Returns True if this worker should run it."""
+    now = now or datetime.utcnow()
+    claimed = db.session.execute(
+        update(JobLease)
+        .where(JobLease.name == name, JobLease.expires_at <= now)
+        .values(owner=OWNER, expires_at=now + interval, last_run_at=now)
+        .execution_options(synchronize_session=False, bump_versions=False)
+    ).rowcount
+    if claimed:
+        db.session.commit()
+        return True
+
+    if db.session.get(JobLease, name) is not None:
+        db.session.rollback()
+        return False
+
+    db.session.add(JobLease(name=name, owner=OWNER, expires_at=now + interval, last_run_at=now))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return True
+
+
+def run_pending(now=None):
+    """Run every due job once in the current app context. Returns the names of the jobs run."""
+    ran = []
+    for entry in list(_jobs.values()):
+        if not acquire(entry.name, entry.interval, now):
+            continue
+        try:
+            entry.func()
+            db.session.commit()
+            ran.append(entry.name)
+        except Exception:
+            db.session.rollback()
+            logger.exception('Scheduled job %s failed', entry.name)
+    return ran
+
+
+def _loop(app):
+    tick = app.config.get('SCHEDULER_TICK_SECONDS', 30)
+    while True:
+        with app.app_context():
+            try:
+                run_pending()
+            except Exception:
+                logger.exception('Scheduler tick failed')
+            finally:
+                db.session.remove()
+        socketio.sleep(tick)
+
+
+def start(app):
+    """Start the background loop once per process."""
+    global _started
+    if _started:
+        return
+    _started = True
+    socketio.start_background_task(_loop, app)
+
+
+def init_app(app):
+    """Start the scheduler on the first request when SCHEDULER_ENABLED is set."""
+    if not app.config.get('SCHEDULER_ENABLED'):
+        return
+
+    @app.before_request
+    def _start_scheduler():
+        if not _started:
+            start(app)
@@ -0,0 +1,105 @@
+"""
+Access tokens that carry their own authorization claims.
+
+Access tokens embed the user's role, seller flag and store id, plus `tv`,
+the user's token_version when the token was issued. Route checks read the
+claims with claim() and do not load the User row. Access tokens are short
+lived (JWT_ACCESS_TOKEN_EXPIRES), so the frontend refreshes often, and each
+refresh issues fresh claims from the database.
+
+revoke(user) bumps token_version. When the transaction commits, every
+access token issued before it fails the blocklist check, and the frontend
+refreshes to get new claims. Suspensions, role changes and store approval
+revoke this way. The current version of each user is kept in process
+memory, so only the first request after a restart or revocation reads it
+from the database.
+"""
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt, get_jwt_identity
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import User
+from app.services.cache import TTLCache
+
+
+_versions = TTLCache(ttl=900, maxsize=10000)  # user id -> current token_version
+
+
+def claims(user):
+    """Claims embedded in a user's access tokens."""
+    return {
+        'role': user.role,
+        'is_seller': bool(user.is_seller),
+        'store_id': user.store.id if user.store else None,
+        'tv': user.token_version or 0,
+    }
+
+
+def access_token(user):
+    return create_access_token(identity=str(user.id), additional_claims=claims(user))
+
+
+def issue(user):
+    """(access token, refresh token) for a login."""
+    return access_token(user), create_refresh_token(identity=str(user.id))
+
+
+def claim(name):
+    """A claim of the current access token. Tokens issued before claims existed fall back to the database."""
+    token = get_jwt()
+    if name in token:
+        return token[name]
+    user = db.session.get(User, int(get_jwt_identity()))
+    return claims(user)[name] if user else None
+
+
+def revoke(user):
+    """Invalidate the user's existing access tokens once the caller commits."""
+    user.token_version = (user.token_version or 0) + 1
+    db.session.info.setdefault('token_versions', {})[user.id] = user.token_version
+
+
+def _current_version(user_id):
+    version = _versions.get(user_id)
+    if version is None:
+        version = db.session.scalar(select(User.token_version).where(User.id == user_id))
+        if version is None:
+            return None
+        _versions.set(user_id, version)
+    return version
+
+
+def _is_revoked(jwt_header, jwt_payload):
+    # Refresh tokens are not versioned; /auth/refresh reloads the user instead
+    if jwt_payload.get('type') != 'access':
+        return False
+    current = _current_version(int(jwt_payload['sub']))
+    return current is None or jwt_payload.get('tv', 0) != current
+
+
+def _after_commit(session):
+    for user_id, version in session.info.pop('token_versions', {}).items():
+        _versions.set(user_id, version)
+
+
+def _after_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('token_versions', None)
+
+
+def init_app(app, jwt):
+    """Register the blocklist check and the listeners that publish revocations."""
+    _versions.ttl = int(app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds())
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return _is_revoked(jwt_header, jwt_payload)
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return {'message': 'Token has been revoked', 'error': 'token_revoked'}, 401
+
+    if not event.contains(Session, 'after_commit', _after_commit):
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_soft_rollback', _after_rollback)
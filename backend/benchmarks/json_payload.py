@@ -0,0 +1,105 @@
+"""
+Micro-benchmark: serializing a 100-product listing payload.
+
+Compares Flask's default JSON provider with the orjson provider, and shows
+the payload size on the wire with gzip and brotli.
+
+Usage: python benchmarks/json_payload.py [iterations]
+"""
+import gzip
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.services.json_provider import OrjsonProvider, orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_listing(count=100):
+    """Payload shaped like get_products(): Product.to_dict(include_store=True) x count."""
+    now = datetime(2026, 3, 1, 12, 0, 0)
+    store = {
+        'id': 7, 'owner_id': 12, 'name': 'Mama Put Kitchen', 'slug': 'mama-put-kitchen-12',
+        'description': 'Hot meals every day from 8am to 9pm at the hostel gate.',
+        'logo_url': '/api/v1/uploads/stores/store_12_logo.png', 'banner_url': None,
+        'address': 'Block C, Male Hostel', 'phone': '08012345678', 'email': 'kitchen@example.com',
+        'is_verified': True, 'is_active': True, 'is_featured': False, 'store_type': 'kitchen',
+        'is_open': True, 'rating': 4.6, 'total_reviews': 83, 'total_orders': 412, 'total_products': 25,
+        'created_at': (now - timedelta(days=90)).isoformat(),
+        'bank_name': 'Opay', 'account_number': '8012345678', 'account_name': 'Mama Put',
+    }
+    products = []
+    for i in range(count):
+        products.append({
+            'id': i + 1,
+            'store_id': 7,
+            'title': f'Jollof rice and chicken combo #{i}',
+            'slug': f'jollof-rice-and-chicken-combo-{i}-1772366400',
+            'description': 'Smoky party jollof with fried plantain, coleslaw and a quarter chicken. ' * 3,
+            'price': float(Decimal('1500.00') + i),
+            'compare_price': float(Decimal('1800.00')) if i % 3 == 0 else None,
+            'product_type': 'food',
+            'stock_quantity': 20 + i,
+            'is_in_stock': True,
+            'pickup_location': 'Block C, Male Hostel',
+            'prep_time': '20 mins',
+            'is_active': True,
+            'is_featured': i % 10 == 0,
+            'rating': 4.5,
+            'total_reviews': 12,
+            'total_orders': 40 + i,
+            'views': 300 + i,
+            'categories': [{'id': 3, 'name': 'Food', 'slug': 'food', 'icon': 'food', 'banner_url': None,
+                            'description': 'Meals and snacks', 'is_active': True, 'sort_order': 1}],
+            'media': [{'id': i * 3 + k, 'url': f'/api/v1/uploads/products/{i + 1}_{k}_photo.jpeg',
+                       'media_type': 'image', 'sort_order': k} for k in range(3)],
+            'created_at': (now - timedelta(hours=i)).isoformat(),
+            'store': store,
+        })
+    return {
+        'products': products,
+        'pagination': {'page': 1, 'limit': count, 'total': 1000, 'pages': 10},
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    payload = build_listing()
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    results = [('flask default', lambda: default.response(payload).get_data())]
+    if orjson is not None:
+        fast = OrjsonProvider(app)
+        results.append(('orjson', lambda: fast.response(payload).get_data()))
+    else:
+        print('orjson not installed - only measuring the default provider')
+
+    with app.app_context():
+        baseline = None
+        for name, fn in results:
+            seconds = timeit.timeit(fn, number=iterations) / iterations
+            baseline = baseline or seconds
+            print(f'{name:>14}: {seconds * 1e3:7.3f} ms/response  ({baseline / seconds:4.1f}x)')
+
+        body = results[-1][1]()
+
+    print(f'\n{"raw":>14}: {len(body):7d} bytes')
+    print(f'{"gzip (6)":>14}: {len(gzip.compress(body, compresslevel=6)):7d} bytes')
+    if brotli is not None:
+        print(f'{"brotli (4)":>14}: {len(brotli.compress(body, quality=4)):7d} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Login throughput under eventlet, and how much logins stall everything else.
+
+Monkey-patches eventlet like run.py, then fires concurrent POST
+/api/v1/auth/login requests from green threads. Meanwhile a probe green
+thread requests /api/health every 10 ms and records how long each request
+took, counting any delay in waking up. With PASSWORD_HASH_THREADPOOL on,
+bcrypt runs in eventlet's thread pool and the probe stays fast. With it off
+(--inline), every hash blocks the hub and the probe waits behind it.
+
+Runs against DATABASE_URL; defaults to a temporary SQLite file.
+
+Usage: python benchmarks/login_throughput.py [logins] [concurrency] [rounds] [--inline]
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+_tmp = None
+if not os.getenv('DATABASE_URL'):
+    _tmp = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{_tmp.name}'
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app, db
+from app.models import User
+
+PASSWORD = 'benchmark-password'
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    logins = int(args[0]) if len(args) > 0 else 40
+    concurrency = int(args[1]) if len(args) > 1 else 8
+    rounds = int(args[2]) if len(args) > 2 else 12
+    inline = '--inline' in sys.argv
+
+    app = create_app('development')
+    app.config.update(DEBUG=False, BCRYPT_LOG_ROUNDS=rounds, PASSWORD_HASH_THREADPOOL=not inline,
+                      SCHEDULER_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        email = f'bench-{uuid.uuid4().hex[:8]}@example.com'
+        user = User(first_name='Bench', last_name='Login', email=email, phone='0', is_verified=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+    results = {'ok': 0, 'errors': 0}
+    probe_latencies = []
+    done = []
+
+    def login():
+        response = app.test_client().post('/api/v1/auth/login', json={'email': email, 'password': PASSWORD})
+        results['ok' if response.status_code == 200 else 'errors'] += 1
+
+    def probe():
+        client = app.test_client()
+        while not done:
+            began = time.perf_counter()
+            eventlet.sleep(0.01)
+            client.get('/api/health')
+            probe_latencies.append((time.perf_counter() - began) * 1000 - 10)
+
+    prober = eventlet.spawn(probe)
+    pool = eventlet.GreenPool(concurrency)
+    began = time.perf_counter()
+    for _ in range(logins):
+        pool.spawn_n(login)
+    pool.waitall()
+    elapsed = time.perf_counter() - began
+    done.append(True)
+    prober.wait()
+
+    mode = 'inline' if inline else 'tpool'
+    print(f'{logins} logins, concurrency {concurrency}, cost {rounds}, bcrypt {mode}')
+    print(f"{elapsed:.2f}s ({logins / elapsed:.1f} logins/s) ok={results['ok']} errors={results['errors']}")
+    print(f'/api/health during logins: {len(probe_latencies)} probes, '
+          f'p50={_percentile(probe_latencies, 50):.1f}ms p99={_percentile(probe_latencies, 99):.1f}ms '
+          f'max={max(probe_latencies, default=0):.1f}ms')
+
+    if _tmp is not None:
+        os.unlink(_tmp.name)
+
+
+if __name__ == '__main__':
+    main()
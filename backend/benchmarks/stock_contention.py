@@ -0,0 +1,110 @@
+"""
+Contention check: many buyers ordering one product at the same time.
+
+Fires concurrent POST /api/v1/orders requests for a product with limited stock
+and verifies that the stock is never oversold: the number of accepted orders
+equals the starting stock, the stock ends at zero, and every accepted order
+holds exactly one active reservation.
+
+Runs against DATABASE_URL (use a disposable Postgres database to exercise real
+row locking); defaults to a temporary SQLite file.
+
+Usage: python benchmarks/stock_contention.py [threads] [attempts_per_thread] [stock]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+_tmp = None
+if not os.getenv('DATABASE_URL'):
+    _tmp = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{_tmp.name}'
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import Product, ReservationStatus, StockReservation, Store, User
+
+
+def _user(tag, **kwargs):
+    user = User(first_name=tag, last_name='Load', email=f'{tag}-{uuid.uuid4().hex[:8]}@example.com',
+                phone='0', is_verified=True, **kwargs)
+    user.set_password(uuid.uuid4().hex)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def seed(stock):
+    seller = _user('seller', is_seller=True, role='seller')
+    buyer = _user('buyer')
+    store = Store(owner_id=seller.id, name='Contention Kitchen', slug=f'contention-{uuid.uuid4().hex[:8]}')
+    db.session.add(store)
+    db.session.flush()
+    product = Product(store_id=store.id, title='Lunch special', slug=f'lunch-{uuid.uuid4().hex[:8]}',
+                      price=1500, stock_quantity=stock, product_type='food')
+    db.session.add(product)
+    db.session.commit()
+    return buyer.id, product.id
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    attempts = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    stock = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    app = create_app('development')
+    app.config['DEBUG'] = False
+    with app.app_context():
+        buyer_id, product_id = seed(stock)
+        token = create_access_token(identity=str(buyer_id))
+
+    results = {'accepted': 0, 'sold_out': 0, 'errors': 0}
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker():
+        client = app.test_client()
+        start.wait()
+        for _ in range(attempts):
+            response = client.post('/api/v1/orders', json={'product_id': product_id, 'quantity': 1},
+                                   headers={'Authorization': f'Bearer {token}'})
+            key = {201: 'accepted', 400: 'sold_out'}.get(response.status_code, 'errors')
+            with lock:
+                results[key] += 1
+
+    began = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    with app.app_context():
+        remaining = db.session.get(Product, product_id).stock_quantity
+        held = db.session.query(db.func.coalesce(db.func.sum(StockReservation.quantity), 0)).filter_by(
+            product_id=product_id, status=ReservationStatus.ACTIVE.value).scalar()
+
+    total = threads * attempts
+    print(f'{total} orders from {threads} threads in {elapsed:.2f}s ({total / elapsed:.0f} req/s)')
+    print(f"accepted={results['accepted']} sold_out={results['sold_out']} errors={results['errors']}")
+    print(f'stock: start={stock} remaining={remaining} held={held}')
+
+    assert remaining >= 0, 'stock went negative'
+    assert results['accepted'] == held, 'accepted orders and active holds disagree'
+    assert remaining + held == stock, 'stock was lost or oversold'
+    assert results['accepted'] == min(stock, total), 'orders were refused while stock was available'
+    print('OK: no oversell')
+
+    if _tmp is not None:
+        os.unlink(_tmp.name)
+
+
+if __name__ == '__main__':
+    main()
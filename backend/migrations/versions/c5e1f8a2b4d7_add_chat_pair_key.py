@@ -0,0 +1,60 @@
+"""add canonical user pair key to chats
+
+Revision ID: c5e1f8a2b4d7
+Revises: a3b7d9f0c2e8
+Create Date: 2026-10-19 15:32:18.774120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1f8a2b4d7'
+down_revision = 'a3b7d9f0c2e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_min_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('user_max_id', sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE chats SET
+            user_min_id = CASE WHEN user1_id < user2_id THEN user1_id ELSE user2_id END,
+            user_max_id = CASE WHEN user1_id < user2_id THEN user2_id ELSE user1_id END
+    """)
+
+    # Merge duplicate chats for the same pair into the oldest one
+    keeper = """
+        (SELECT MIN(k.id) FROM chats k
+         WHERE k.user_min_id = chats.user_min_id AND k.user_max_id = chats.user_max_id)
+    """
+    op.execute(f"""
+        UPDATE messages SET chat_id = (
+            SELECT {keeper.replace('chats.', 'c.')} FROM chats c WHERE c.id = messages.chat_id
+        )
+        WHERE chat_id IN (SELECT chats.id FROM chats WHERE chats.id <> {keeper})
+    """)
+    op.execute(f"""
+        UPDATE chats SET last_message_at = (
+            SELECT MAX(d.last_message_at) FROM chats d
+            WHERE d.user_min_id = chats.user_min_id AND d.user_max_id = chats.user_max_id
+        )
+        WHERE chats.id = {keeper}
+    """)
+    op.execute(f"DELETE FROM chats WHERE chats.id <> {keeper}")
+
+    with op.batch_alter_table('chats', schema=None) as batch_op:
+        batch_op.alter_column('user_min_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('user_max_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_unique_constraint('uq_chat_user_pair', ['user_min_id', 'user_max_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('chats', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_chat_user_pair', type_='unique')
+        batch_op.drop_column('user_max_id')
+        batch_op.drop_column('user_min_id')
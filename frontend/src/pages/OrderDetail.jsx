@@ -58,10 +58,17 @@ export default function OrderDetail() {
             }
         }
 
+        // Bulk seller actions send one batch per user
+        const handleOrderBatch = (data) => {
+            data.orders.forEach(handleOrderUpdate)
+        }
+
         socket.on('order_status_update', handleOrderUpdate)
+        socket.on('order_status_batch', handleOrderBatch)
 
         return () => {
             socket.off('order_status_update', handleOrderUpdate)
+            socket.off('order_status_batch', handleOrderBatch)
         }
     }, [socket, id, addToast])
 